@@ -1,9 +1,20 @@
 from django.contrib import admin
+from django.contrib.admin import helpers
+from django.contrib.admin.models import CHANGE, DELETION, LogEntry
+from django.contrib.admin.options import get_content_type_for_model
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Category, Transaction
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Lower
+from django.template.response import TemplateResponse
+from . import batch, category_cache, events, ledger, search
+from .admin_changelist import FastChangeListMixin
+from .authentication import generation_cache_key
+from .models import User, Balance, Category, Transaction
 from django.utils.translation import gettext_lazy as _
 
-class CustomUser(UserAdmin):
+class CustomUser(FastChangeListMixin, UserAdmin):
     model = User
     list_display = ['username', 'email', 'is_staff', 'is_active']
     fieldsets = (
@@ -20,20 +31,144 @@ class CustomUser(UserAdmin):
     )
     search_fields = ['username', 'email']
     ordering = ['email']
+    keyset_ordering = ['email']
+    actions = ['activate', 'deactivate', 'revoke_tokens']
+
+    def get_search_results(self, request, queryset, search_term):
+        # Prefix matches on lower(email) / lower(username), which have
+        # pattern indexes on PostgreSQL (migration 0017).
+        term = search_term.strip().lower()
+        if not term:
+            return queryset, False
+        queryset = queryset.annotate(
+            email_lower=Lower('email'), username_lower=Lower('username')
+        ).filter(Q(email_lower__startswith=term) | Q(username_lower__startswith=term))
+        return queryset, False
+
+    @admin.action(description=_('Activate selected users'))
+    def activate(self, request, queryset):
+        updated = queryset.update(is_active=True)
+        self.message_user(request, _('%d users activated.') % updated)
+
+    @admin.action(description=_('Deactivate selected users'))
+    def deactivate(self, request, queryset):
+        user_ids = list(queryset.values_list('pk', flat=True))
+        updated = User.objects.filter(pk__in=user_ids).update(
+            is_active=False, token_generation=F('token_generation') + 1
+        )
+        cache.delete_many([generation_cache_key(user_id) for user_id in user_ids])
+        self.message_user(request, _('%d users deactivated.') % updated)
+
+    @admin.action(description=_('Revoke API tokens of selected users'))
+    def revoke_tokens(self, request, queryset):
+        user_ids = list(queryset.values_list('pk', flat=True))
+        User.objects.filter(pk__in=user_ids).update(
+            token_generation=F('token_generation') + 1
+        )
+        cache.delete_many([generation_cache_key(user_id) for user_id in user_ids])
+        self.message_user(request, _('Tokens revoked for %d users.') % len(user_ids))
 
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['id', 'name']
     show_full_result_count = False
 
 
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ['category', 'user', 'title', 'amount', 'created_at']
     list_filter = ['category']
     search_fields = ['title']
     list_select_related = ['category', 'user']
-    show_full_result_count = False
+    # Matches the transaction_user_created_idx order.
+    keyset_ordering = ['-created_at', '-id']
+    actions = ['delete_without_loading', 'mark_as_income', 'mark_as_expense']
+
+    def get_actions(self, request):
+        # The stock action loads every selected row to confirm and delete it.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def get_search_results(self, request, queryset, search_term):
+        backend = search.BACKENDS.get(connection.vendor)
+        if backend is None or not search_term.split():
+            return super().get_search_results(request, queryset, search_term)
+        return backend(queryset, search_term.split()), False
+
+    def _apply(self, queryset, op, category_id=None):
+        # One set-based UPDATE or DELETE per owner (see batch.apply_filter);
+        # only the owners' ids are read.
+        count = 0
+        with transaction.atomic():
+            user_ids = queryset.order_by('user_id').values_list('user_id', flat=True)
+            for user_id in user_ids.distinct():
+                batch.lock_user(user_id)
+                count += batch.apply_filter(
+                    user_id, op, queryset.filter(user_id=user_id), category_id
+                )
+                events.transactions_changed(user_id)
+        return count
+
+    def _log(self, request, action_flag, count, message=''):
+        # One entry for the whole selection, which is never loaded.
+        LogEntry.objects.create(
+            user_id=request.user.pk,
+            content_type_id=get_content_type_for_model(self.model).pk,
+            object_repr=_('%d transactions') % count,
+            action_flag=action_flag,
+            change_message=message,
+        )
+
+    @admin.action(
+        description=_('Delete selected transactions'), permissions=['delete']
+    )
+    def delete_without_loading(self, request, queryset):
+        if not request.POST.get('post'):
+            context = {
+                **self.admin_site.each_context(request),
+                'title': _('Are you sure?'),
+                'opts': self.model._meta,
+                'count': queryset.count(),
+                'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+                'select_across': request.POST.get('select_across', '0'),
+                'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+                'media': self.media,
+            }
+            request.current_app = self.admin_site.name
+            return TemplateResponse(
+                request, 'admin/app/transaction/delete_without_loading.html', context
+            )
+        count = self._apply(queryset, 'delete')
+        if count:
+            self._log(request, DELETION, count)
+        self.message_user(request, _('%d transactions deleted.') % count)
+
+    def _set_category(self, request, queryset, name):
+        category_id = category_cache.get_id(name)
+        if category_id is None:
+            self.message_user(request, _('No "%s" category.') % name, 'error')
+            return
+        count = self._apply(queryset, 'update', category_id)
+        if count:
+            self._log(request, CHANGE, count, _('Marked as %s.') % name)
+        self.message_user(request, _('%d transactions updated.') % count)
+
+    @admin.action(description=_('Mark selected as income'), permissions=['change'])
+    def mark_as_income(self, request, queryset):
+        self._set_category(request, queryset, ledger.INCOME)
+
+    @admin.action(description=_('Mark selected as expense'), permissions=['change'])
+    def mark_as_expense(self, request, queryset):
+        self._set_category(request, queryset, ledger.EXPENSE)
+
+
+class BalanceAdmin(admin.ModelAdmin):
+    list_display = ['user', 'income', 'expense', 'balance']
+    list_select_related = ['user']
+    readonly_fields = ['user', 'income', 'expense', 'balance']
+    search_fields = ['user__email']
 
 
 admin.site.register(User, CustomUser)
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Transaction, TransactionAdmin)
+admin.site.register(Balance, BalanceAdmin)
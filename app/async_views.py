@@ -0,0 +1,218 @@
+"""
+Async versions of the hot read endpoints, served under ``/v1/async/``.
+
+DRF views are synchronous, so under ASGI every request is handed to a
+single sync thread. These views stay on the event loop and run each
+independent query (page rows, count, totals) in its own worker thread
+with its own connection, so they overlap instead of running back to back.
+"""
+import asyncio
+import math
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import ledger, rollups
+from .authentication import SignedTokenAuthentication, user_from_token
+from .filters import TransactionFilter
+from .models import Category, Transaction
+from .renderers import FastJSONRenderer
+from .search import TransactionOrderingFilter, TransactionSearchFilter
+from .serializers import (
+    CategorySerializer,
+    TransactionListSerializer,
+    TransactionSerializer,
+)
+from .views import TransactionViewSet, list_rows
+
+
+def run_in_thread(func, *args):
+    """
+    Run ``func`` in a thread of the event loop's (bounded) default pool.
+    The threads live on, and with CONN_MAX_AGE so do their connections:
+    afterwards they are only closed if broken or older than that, as at
+    the end of a request.
+    """
+
+    def wrapper():
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(wrapper, thread_sensitive=False)()
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(
+        FastJSONRenderer().render(data),
+        status=status_code,
+        content_type="application/json",
+    )
+
+
+def error(detail, status_code):
+    return render({"detail": detail}, status_code)
+
+
+def unauthorized():
+    response = error(
+        "Authentication credentials were not provided.",
+        status.HTTP_401_UNAUTHORIZED,
+    )
+    response["WWW-Authenticate"] = SignedTokenAuthentication.keyword
+    return response
+
+
+async def get_user(request):
+    # request.user is lazy and would query the session from the event loop.
+    def resolve():
+        header = request.META.get("HTTP_AUTHORIZATION", "").split()
+        if len(header) == 2 and header[0].lower() == "bearer":
+            try:
+                return user_from_token(header[1])
+            except signing.BadSignature:
+                return None
+        user = request.user
+        return user if user.is_authenticated else None
+
+    return await sync_to_async(resolve)()
+
+
+def get_page(request):
+    try:
+        page = int(request.GET.get("page", 1))
+    except ValueError:
+        page = 0
+    return page if page > 0 else None
+
+
+def page_links(request, page, count, page_size):
+    url = request.build_absolute_uri()
+    last_page = max(1, math.ceil(count / page_size))
+    next_link = (
+        replace_query_param(url, "page", page + 1) if page < last_page else None
+    )
+    if page <= 1:
+        previous_link = None
+    elif page == 2:
+        previous_link = remove_query_param(url, "page")
+    else:
+        previous_link = replace_query_param(url, "page", page - 1)
+    return next_link, previous_link
+
+
+async def transaction_list(request):
+    user = await get_user(request)
+    if user is None:
+        return unauthorized()
+    page = get_page(request)
+    if page is None:
+        return error("Invalid page.", 404)
+
+    queryset = list_rows(Transaction.objects.filter(user_id=user.id))
+    filterset = TransactionFilter(request.GET, queryset=queryset)
+    if not await sync_to_async(filterset.is_valid)():
+        return render(filterset.errors, status.HTTP_400_BAD_REQUEST)
+    # The search and ordering parameters behave as on TransactionViewSet.
+    view = SimpleNamespace(
+        search_fields=TransactionViewSet.search_fields,
+        ordering_fields=TransactionViewSet.ordering_fields,
+        ordering=TransactionViewSet.ordering,
+    )
+    queryset, query = filterset.qs, Request(request)
+    for backend in (TransactionSearchFilter, TransactionOrderingFilter):
+        queryset = backend().filter_queryset(query, queryset, view)
+
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    offset = (page - 1) * page_size
+
+    def fetch_page():
+        rows = queryset[offset : offset + page_size]
+        return TransactionListSerializer(rows, many=True).data
+
+    rows, count, totals, categories = await asyncio.gather(
+        run_in_thread(fetch_page),
+        run_in_thread(queryset.count),
+        run_in_thread(ledger.get_totals, user),
+        run_in_thread(rollups.category_breakdown, user.id),
+    )
+    if not rows and page != 1:
+        return error("Invalid page.", 404)
+
+    next_link, previous_link = page_links(request, page, count, page_size)
+    return render(
+        {
+            "count": count,
+            "next": next_link,
+            "previous": previous_link,
+            "results": {
+                "income": totals["income"],
+                "expense": totals["expense"],
+                "balance": totals["balance"],
+                "transactions": rows,
+                "categories": categories,
+            },
+        }
+    )
+
+
+async def transaction_detail(request, pk):
+    user = await get_user(request)
+    if user is None:
+        return unauthorized()
+
+    def fetch():
+        obj = (
+            Transaction.objects.select_related("category")
+            .filter(user_id=user.id, pk=pk)
+            .first()
+        )
+        return TransactionSerializer(obj).data if obj else None
+
+    data = await run_in_thread(fetch)
+    if data is None:
+        return error("Not found.", 404)
+    return render(data)
+
+
+async def balance(request):
+    user = await get_user(request)
+    if user is None:
+        return unauthorized()
+    return render(await run_in_thread(ledger.get_totals, user))
+
+
+async def category_list(request):
+    user = await get_user(request)
+    if user is None:
+        return unauthorized()
+    if not user.is_staff:
+        return error("You do not have permission to perform this action.", 403)
+    page = get_page(request)
+    if page is None:
+        return error("Invalid page.", 404)
+
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    offset = (page - 1) * page_size
+    queryset = Category.objects.order_by("id")
+
+    def fetch_page():
+        context = {"category_totals": rollups.category_totals(user.id)}
+        rows = queryset[offset : offset + page_size]
+        return CategorySerializer(rows, many=True, context=context).data
+
+    rows, count = await asyncio.gather(
+        run_in_thread(fetch_page), run_in_thread(Category.objects.count)
+    )
+    next_link, previous_link = page_links(request, page, count, page_size)
+    return render(
+        {"count": count, "next": next_link, "previous": previous_link, "results": rows}
+    )
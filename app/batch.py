@@ -0,0 +1,281 @@
+"""
+Many transaction writes in one request and one database transaction, for
+``POST /v1/transaction/batch/``. Operations are::
+
+    {"op": "create", "data": {...}}
+    {"op": "update", "id": 7, "data": {...}}        (partial)
+    {"op": "delete", "id": 7}
+    {"op": "update", "filter": {...}, "data": {"category": "income"}}
+    {"op": "delete", "filter": {...}}
+
+``filter`` takes the list endpoint's TransactionFilter parameters (year,
+month, category, created_after, created_before).
+
+Operations on single rows are applied together. That means one
+bulk_create, one locking SELECT with a bulk_update, and one DELETE. The
+ledger, rollups, suggestions and change feed are then adjusted by their
+net effect. Filter operations then run in order, each as one UPDATE
+that also numbers the rows for the change feed, or as an INSERT ...
+SELECT of tombstones and one DELETE. Their summaries are adjusted from
+GROUP BY aggregates, so no matched row is loaded. If any operation is
+invalid nothing is written.
+"""
+import datetime
+
+from django.db import transaction
+from django.db.models import Count, Max
+from rest_framework import serializers
+
+from . import bulk, changes, events, ledger, rollups, suggestions
+from .filters import TransactionFilter
+from .models import Balance, Transaction
+from .serializers import TransactionSerializer
+
+OPERATIONS = ("create", "update", "delete")
+ROW_FIELDS = ("id", "user_id", "category_id", "amount", "created_at", "title")
+
+
+class BatchError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _as_row(obj):
+    return {field: getattr(obj, field) for field in ROW_FIELDS}
+
+
+def _filtered(user, params):
+    if not isinstance(params, dict) or not set(params) & set(
+        TransactionFilter.base_filters
+    ):
+        names = ", ".join(TransactionFilter.base_filters)
+        raise serializers.ValidationError({"filter": f"Give at least one of: {names}."})
+    filterset = TransactionFilter(
+        params, queryset=Transaction.objects.filter(user_id=user.id)
+    )
+    if not filterset.is_valid():
+        raise serializers.ValidationError({"filter": filterset.errors})
+    return filterset.qs.order_by()
+
+
+def _validated(user, data, partial=False):
+    serializer = TransactionSerializer(
+        data=data, partial=partial, context={"user": user}
+    )
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+def parse(user, operation):
+    """
+    Validate one operation and return ``(kind, payload)``, where kind is
+    create, update, delete or filter. Raises ValidationError.
+    """
+    if not isinstance(operation, dict):
+        raise serializers.ValidationError({"detail": "Expected an object."})
+    op = operation.get("op")
+    if op not in OPERATIONS:
+        raise serializers.ValidationError(
+            {"op": f"Must be one of: {', '.join(OPERATIONS)}."}
+        )
+    data = operation.get("data", {})
+    if not isinstance(data, dict):
+        raise serializers.ValidationError({"data": "Expected an object."})
+
+    if op == "create":
+        return "create", Transaction(user_id=user.id, **_validated(user, data))
+    if "filter" in operation:
+        category_id = None
+        if op == "update":
+            if set(data) != {"category"}:
+                raise serializers.ValidationError(
+                    {"data": "Only category can be changed by filter."}
+                )
+            category_id = _validated(user, data, partial=True)["category_id"]
+        return "filter", (op, _filtered(user, operation["filter"]), category_id)
+
+    pk = operation.get("id")
+    if not isinstance(pk, int) or isinstance(pk, bool):
+        raise serializers.ValidationError({"id": "An integer id is required."})
+    if op == "update":
+        return "update", (pk, _validated(user, data, partial=True))
+    return "delete", pk
+
+
+def lock_user(user_id):
+    # Every write to the user's transactions takes this lock (see
+    # ledger.apply_delta), so the rows matched by a filter can't change
+    # until the caller's transaction commits.
+    Balance.objects.get_or_create(user_id=user_id)
+    list(Balance.objects.select_for_update().filter(user_id=user_id).values("pk"))
+
+
+def apply_filter(user_id, op, queryset, category_id=None):
+    """
+    Move the rows of ``queryset``, one user's transactions, to
+    ``category_id`` (op "update") or delete them (op "delete") without
+    loading them, and return how many changed. Call it inside a database
+    transaction that holds lock_user().
+    """
+    if op == "update":
+        queryset = queryset.exclude(category_id=category_id)
+    groups = list(rollups.grouped(queryset))
+    if not groups:
+        return 0
+    titles = list(
+        queryset.values("title", "category_id").annotate(
+            count=Count("id"), last_used=Max("created_at")
+        )
+    )
+
+    if op == "delete":
+        count = changes.delete(user_id, queryset)
+    else:
+        count = changes.update(user_id, queryset, category_id=category_id)
+
+    amounts = []
+    for group in groups:
+        moves = [(group["category_id"], -1)]
+        if category_id is not None:
+            moves.append((category_id, 1))
+        for moved_to, sign in moves:
+            rollups.apply_delta(
+                user_id,
+                group["year"],
+                group["month"],
+                moved_to,
+                sign * group["total"],
+                sign * group["count"],
+                create=sign > 0,
+            )
+            amounts.append((moved_to, sign * group["total"]))
+    ledger.apply_delta(user_id, *ledger.contributions(amounts))
+
+    for row in titles:
+        suggestions.apply(user_id, row["title"], row["category_id"], -row["count"])
+        if category_id is not None:
+            suggestions.apply(
+                user_id, row["title"], category_id, row["count"], row["last_used"]
+            )
+    return count
+
+
+def _apply_rows(user, removed, added):
+    income, expense = ledger.contributions(
+        (row["category_id"], sign * row["amount"])
+        for rows, sign in ((removed, -1), (added, 1))
+        for row in rows
+    )
+    ledger.apply_delta(user.id, income, expense)
+    rollups.apply_changes(removed, added)
+    suggestions.apply_changes(removed, added)
+
+
+def run(user, operations):
+    """
+    Validate and apply ``operations`` for ``user`` and return one result
+    per operation. Raises BatchError with ``{"index", "errors"}`` items,
+    or bulk.TooManyRows.
+    """
+    limit = bulk.max_rows()
+    if len(operations) > limit:
+        raise bulk.TooManyRows(f"A batch can contain at most {limit} operations.")
+
+    errors = []
+    creates, updates, deletes, filters = [], {}, {}, []
+    for index, operation in enumerate(operations):
+        try:
+            kind, payload = parse(user, operation)
+        except serializers.ValidationError as e:
+            errors.append({"index": index, "errors": e.detail})
+            continue
+        if kind == "create":
+            creates.append((index, payload))
+        elif kind == "filter":
+            filters.append((index, payload))
+        else:
+            pk = payload[0] if kind == "update" else payload
+            if pk in updates or pk in deletes:
+                errors.append(
+                    {"index": index, "errors": {"id": "Used twice in this batch."}}
+                )
+                continue
+            target = updates if kind == "update" else deletes
+            target[pk] = (index, payload)
+    if errors:
+        raise BatchError(errors)
+
+    results = [None] * len(operations)
+    with transaction.atomic():
+        lock_user(user.id)
+        rows = {
+            obj.pk: obj
+            for obj in Transaction.objects.select_for_update().filter(
+                user_id=user.id, pk__in=[*updates, *deletes]
+            )
+        }
+        missing = [
+            {"index": index, "errors": {"id": "Not found."}}
+            for pk, (index, _) in {**updates, **deletes}.items()
+            if pk not in rows
+        ]
+        if missing:
+            raise BatchError(sorted(missing, key=lambda error: error["index"]))
+
+        if creates:
+            created = bulk.create_transactions(user, [obj for _, obj in creates])
+            if any(obj.pk is None for obj in created):
+                # Backends that can't return ids from a bulk insert; the
+                # change sequence numbers are unique per user.
+                ids = dict(
+                    Transaction.objects.filter(
+                        user_id=user.id,
+                        change_seq__in=[obj.change_seq for obj in created],
+                    ).values_list("change_seq", "id")
+                )
+                for obj in created:
+                    obj.pk = obj.id = ids[obj.change_seq]
+            data = TransactionSerializer(created, many=True).data
+            for (index, obj), row in zip(creates, data):
+                results[index] = {"op": "create", "id": obj.pk, "transaction": row}
+
+        removed, added = [], []
+        if updates:
+            objs = [rows[pk] for pk in updates]
+            removed += [_as_row(obj) for obj in objs]
+            today = datetime.date.today()
+            for obj, seq in zip(objs, changes.reserve(user.id, len(objs))):
+                _, validated = updates[obj.pk][1]
+                for field, value in validated.items():
+                    setattr(obj, field, value)
+                obj.change_seq = seq
+                obj.last_updated = today
+            Transaction.objects.bulk_update(
+                objs,
+                ["title", "amount", "category", "change_seq", "last_updated"],
+                batch_size=bulk.default_batch_size(),
+            )
+            added += [_as_row(obj) for obj in objs]
+            data = TransactionSerializer(objs, many=True).data
+            for obj, row in zip(objs, data):
+                index = updates[obj.pk][0]
+                results[index] = {"op": "update", "id": obj.pk, "transaction": row}
+
+        if deletes:
+            removed += [_as_row(rows[pk]) for pk in deletes]
+            doomed = Transaction.objects.filter(user_id=user.id, pk__in=list(deletes))
+            doomed._raw_delete(doomed.db)
+            changes.record(deleted=[(pk, user.id) for pk in deletes])
+            for pk, (index, _) in deletes.items():
+                results[index] = {"op": "delete", "id": pk}
+
+        if removed or added:
+            _apply_rows(user, removed, added)
+
+        for index, (op, queryset, category_id) in filters:
+            count = apply_filter(user.id, op, queryset, category_id)
+            results[index] = {"op": op, "count": count}
+
+        events.transactions_changed(user.id)
+    return results
@@ -0,0 +1,88 @@
+import codecs
+import csv
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import changes, events, ledger, partitions, rollups, suggestions
+from .models import Transaction
+from .serializers import TransactionSerializer
+
+
+class TooManyRows(Exception):
+    pass
+
+
+def max_rows():
+    return getattr(settings, "TRANSACTION_BULK_MAX_ROWS", 5000)
+
+
+def default_batch_size():
+    return getattr(settings, "TRANSACTION_BULK_BATCH_SIZE", 500)
+
+
+def iter_csv_rows(upload):
+    """Yield one dict per CSV line without reading the whole upload."""
+    return csv.DictReader(codecs.iterdecode(upload, "utf-8-sig"))
+
+
+def validate_rows(user, rows):
+    """
+    Run every row through TransactionSerializer.
+
+    Returns unsaved Transaction instances for the valid rows and a list of
+    ``{"row": index, "errors": ...}`` for the others.
+    """
+    limit = max_rows()
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        if index >= limit:
+            raise TooManyRows(f"A batch can contain at most {limit} rows.")
+        if not isinstance(row, dict):
+            errors.append({"row": index, "errors": {"detail": "Expected an object."}})
+            continue
+        serializer = TransactionSerializer(data=row, context={"user": user})
+        if serializer.is_valid():
+            valid.append(Transaction(user_id=user.id, **serializer.validated_data))
+        else:
+            errors.append({"row": index, "errors": serializer.errors})
+    return valid, errors
+
+
+def create_transactions(user, objs, batch_size=None):
+    """
+    Insert ``objs`` with bulk_create and update the user's ledger, monthly
+    rollups and title suggestions in the same database transaction
+    (bulk_create sends no signals).
+    """
+    income, expense = ledger.contributions(
+        (obj.category_id, obj.amount) for obj in objs
+    )
+
+    with transaction.atomic():
+        partitions.ensure(obj.created_at or timezone.now() for obj in objs)
+        for obj, seq in zip(objs, changes.reserve(user.id, len(objs))):
+            obj.change_seq = seq
+        created = Transaction.objects.bulk_create(
+            objs, batch_size=batch_size or default_batch_size()
+        )
+        ledger.apply_delta(user.id, income, expense)
+        rollups.apply_transactions(created)
+        suggestions.apply_transactions(created)
+        events.transactions_changed(user.id)
+    return created
+
+
+def refresh_summaries(user_ids):
+    """
+    Recompute the ledger, rollups and suggestions of ``user_ids`` after
+    their transactions were changed with queryset update()/delete(), which
+    send no signals, and bump their data version.
+    """
+    ledger.rebuild(user_ids)
+    rollups.rebuild(user_ids)
+    suggestions.rebuild(user_ids)
+    for user_id in user_ids:
+        ledger.apply_delta(user_id, create=False)
+        events.transactions_changed(user_id)
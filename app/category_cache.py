@@ -0,0 +1,68 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Category
+
+_lock = threading.Lock()
+_state = {"loaded_at": None, "by_name": {}, "by_id": {}, "fingerprint": ""}
+
+
+def _ttl():
+    return getattr(settings, "CATEGORY_CACHE_TTL", 300)
+
+
+def _load():
+    by_name, by_id = {}, {}
+    for pk, name in Category.objects.order_by("id").values_list("id", "name"):
+        by_name.setdefault(name, pk)
+        by_id[pk] = name
+    fingerprint = hashlib.sha1(repr(sorted(by_id.items())).encode()).hexdigest()
+    with _lock:
+        _state.update(
+            loaded_at=time.monotonic(),
+            by_name=by_name,
+            by_id=by_id,
+            fingerprint=fingerprint,
+        )
+    return _state
+
+
+def _current(refresh=False):
+    state = _state
+    loaded_at = state["loaded_at"]
+    if refresh or loaded_at is None or time.monotonic() - loaded_at > _ttl():
+        state = _load()
+    return state
+
+
+def get_id(name):
+    """
+    Return the id of the category called ``name`` or None.
+
+    A miss reloads the table once so categories added by another worker
+    are picked up before the TTL runs out.
+    """
+    state = _current()
+    if name not in state["by_name"]:
+        state = _current(refresh=True)
+    return state["by_name"].get(name)
+
+
+def get_name(category_id):
+    state = _current()
+    if category_id not in state["by_id"]:
+        state = _current(refresh=True)
+    return state["by_id"].get(category_id)
+
+
+def fingerprint():
+    """Hash of the current category table, changes whenever a name does."""
+    return _current()["fingerprint"]
+
+
+def invalidate():
+    with _lock:
+        _state["loaded_at"] = None
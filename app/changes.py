@@ -0,0 +1,177 @@
+"""
+Per-user change feed for transactions.
+
+Every write stamps the transaction's ``change_seq`` and every delete
+leaves a TransactionTombstone, numbered from the owner's Balance.version.
+That counter is bumped under the Balance row lock, which is held until
+commit, so a user's changes become visible in sequence order: a client
+that asks for everything after the last sequence it saw can't miss one.
+(A global database sequence could commit out of order.)
+
+Each row and tombstone gets its own number, so batches can be resumed
+from any ``next`` value; see ``TransactionViewSet.changes``.
+"""
+
+from collections import defaultdict
+
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Balance, Transaction, TransactionTombstone
+
+
+def last_seq(user_id):
+    return (
+        Balance.objects.filter(user_id=user_id)
+        .values_list("version", flat=True)
+        .first()
+    )
+
+
+def reserve(user_id, count=1):
+    """Bump the user's version by ``count`` and return the numbers it skipped."""
+    with transaction.atomic():
+        Balance.objects.get_or_create(user_id=user_id)
+        Balance.objects.filter(user_id=user_id).update(version=F("version") + count)
+        last = last_seq(user_id)
+    return range(last - count + 1, last + 1)
+
+
+def stamp(instance):
+    """
+    Store the change_seq given to a transaction before it was saved, when
+    save(update_fields=...) left it out.
+    """
+    Transaction.objects.filter(pk=instance.pk).update(change_seq=instance.change_seq)
+
+
+def tombstone(transaction_id, user_id):
+    """
+    Record a deleted transaction and return its sequence number, unless
+    its owner is being deleted too.
+    """
+    seq = last_seq(user_id)
+    if seq is not None:
+        TransactionTombstone.objects.create(
+            user_id=user_id, transaction_id=transaction_id, change_seq=seq
+        )
+    return seq
+
+
+def record(changed=(), deleted=()):
+    """
+    Number transactions written with queryset update() or delete(), which
+    send no signals. Both take ``(transaction_id, user_id)`` pairs; record
+    ``deleted`` before the rows are gone or after, it only needs the ids.
+    """
+    by_user = defaultdict(lambda: ([], []))
+    for pk, user_id in changed:
+        by_user[user_id][0].append(pk)
+    for pk, user_id in deleted:
+        by_user[user_id][1].append(pk)
+
+    with transaction.atomic():
+        for user_id, (changed_ids, deleted_ids) in by_user.items():
+            seqs = iter(reserve(user_id, len(changed_ids) + len(deleted_ids)))
+            Transaction.objects.bulk_update(
+                [Transaction(pk=pk, change_seq=next(seqs)) for pk in changed_ids],
+                ["change_seq"],
+                batch_size=1000,
+            )
+            TransactionTombstone.objects.bulk_create(
+                [
+                    TransactionTombstone(
+                        user_id=user_id, transaction_id=pk, change_seq=next(seqs)
+                    )
+                    for pk in deleted_ids
+                ],
+                batch_size=1000,
+            )
+
+
+def _numbered(queryset, start):
+    """SELECT of ``id, seq`` for the rows of ``queryset``, from ``start`` up."""
+    sql, params = queryset.order_by().values("id").query.sql_with_params()
+    return (
+        "SELECT id, %s + ROW_NUMBER() OVER (ORDER BY id) - 1 AS seq "
+        f"FROM ({sql}) matched",
+        [start, *params],
+    )
+
+
+def update(user_id, queryset, **values):
+    """
+    ``queryset.update(**values)`` for one user's transactions that also
+    numbers the rows, in a single UPDATE, without loading them. ``values``
+    are column values. Returns the number of rows updated.
+    """
+    queryset = queryset.using(router.db_for_write(Transaction))
+    count = queryset.count()
+    if not count:
+        return 0
+    connection = connections[queryset.db]
+    quote = connection.ops.quote_name
+    table = quote(Transaction._meta.db_table)
+    numbered, params = _numbered(queryset, reserve(user_id, count)[0])
+    assignments = "".join(f", {quote(column)} = %s" for column in values)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET change_seq = numbered.seq{assignments} "
+            f"FROM ({numbered}) numbered WHERE {table}.id = numbered.id",
+            [*values.values(), *params],
+        )
+        return cursor.rowcount
+
+
+def delete(user_id, queryset):
+    """
+    Tombstone and delete the rows of ``queryset``, one user's transactions,
+    with an INSERT ... SELECT and a DELETE. Returns the number of rows.
+    """
+    queryset = queryset.using(router.db_for_write(Transaction))
+    count = queryset.count()
+    if not count:
+        return 0
+    connection = connections[queryset.db]
+    tombstones = connection.ops.quote_name(TransactionTombstone._meta.db_table)
+    numbered, params = _numbered(queryset, reserve(user_id, count)[0])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {tombstones} "
+            "(user_id, transaction_id, change_seq, deleted_at) "
+            f"SELECT %s, id, seq, %s FROM ({numbered}) numbered",
+            [
+                user_id,
+                connection.ops.adapt_datetimefield_value(timezone.now()),
+                *params,
+            ],
+        )
+    return queryset._raw_delete(queryset.db)
+
+
+def since(user_id, seq, limit):
+    """
+    Return ``(rows, deleted_ids, next_seq, has_more)`` for the first
+    ``limit`` changes after ``seq``. ``rows`` are ``.values()`` dicts of
+    the current state of changed transactions.
+    """
+    rows = list(
+        Transaction.objects.filter(user_id=user_id, change_seq__gt=seq)
+        .order_by("change_seq")
+        .values("id", "category_id", "title", "amount", "created_at", "change_seq")[
+            : limit + 1
+        ]
+    )
+    deleted = list(
+        TransactionTombstone.objects.filter(user_id=user_id, change_seq__gt=seq)
+        .order_by("change_seq")
+        .values_list("change_seq", "transaction_id")[: limit + 1]
+    )
+
+    seqs = sorted([row["change_seq"] for row in rows] + [s for s, _ in deleted])
+    has_more = len(seqs) > limit
+    next_seq = seqs[limit - 1] if has_more else (seqs[-1] if seqs else seq)
+    rows = [row for row in rows if row["change_seq"] <= next_seq]
+    deleted_ids = [pk for s, pk in deleted if s <= next_seq]
+    return rows, deleted_ids, next_seq, has_more
@@ -0,0 +1,44 @@
+"""
+Settings that need a cache every worker process shares.
+
+Read-your-writes routing (app.replicas) and the token generation cache
+(app.authentication) are turned off while the default cache is
+per-process, since a write or revocation seen by one worker would be
+missed by the others; these checks say so at startup.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Warning, register
+
+
+def shared_cache():
+    """Whether the default cache is shared between worker processes."""
+    return not isinstance(caches["default"], (LocMemCache, DummyCache))
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    if shared_cache():
+        return []
+    warnings = []
+    if getattr(settings, "DATABASE_REPLICAS", []):
+        warnings.append(
+            Warning(
+                "DATABASE_REPLICAS is set but the default cache is per-process, "
+                "so reads stay on the primary.",
+                hint="Set CACHE_BACKEND and CACHE_LOCATION to a shared cache.",
+                id="app.W001",
+            )
+        )
+    if getattr(settings, "TOKEN_GENERATION_CACHE_TIMEOUT", 60):
+        warnings.append(
+            Warning(
+                "TOKEN_GENERATION_CACHE_TIMEOUT is set but the default cache is "
+                "per-process, so token generations are read on every request.",
+                hint="Set CACHE_BACKEND and CACHE_LOCATION to a shared cache.",
+                id="app.W002",
+            )
+        )
+    return warnings
@@ -0,0 +1,220 @@
+"""
+Per-user pub/sub of transaction and balance updates, pushed to clients
+by app.push.
+
+Once a write to a user's transactions commits, one small JSON event is
+published to that user:
+
+* ``{"type": "upsert", "seq", "transaction", "balance"}`` for a saved row;
+* ``{"type": "delete", "seq", "id", "balance"}`` for a deleted one;
+* ``{"type": "changes", "balance"}`` after bulk writes. The client catches
+  up through ``/v1/transaction/changes/``, as it does after missing
+  events (the queue overflowed or it reconnected).
+
+The event is encoded once and handed to every subscriber as a string.
+``EVENTS_BACKEND`` picks the broker: LocalBroker reaches subscribers of
+this process only, PostgresBroker goes through NOTIFY so every worker
+sees every event.
+"""
+import asyncio
+import logging
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+
+from . import ledger
+from .renderers import FastJSONRenderer
+from .serializers import TransactionSerializer
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "app_events"
+# NOTIFY payloads must stay under 8000 bytes.
+MAX_NOTIFY_PAYLOAD = 7900
+
+
+def encode(event):
+    return FastJSONRenderer().render(event).decode()
+
+
+CATCH_UP = encode({"type": "changes"})
+
+
+class Subscription:
+    """A bounded queue of one connection's events, on its event loop."""
+
+    def __init__(self, broker, user_id, maxsize):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Rather than buffer without limit for a slow client, drop the
+            # backlog and tell it to catch up through the change feed.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(CATCH_UP)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """Delivers events to the subscribers of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, user_id):
+        """Call from the event loop that will read the subscription."""
+        subscription = Subscription(
+            self, user_id, getattr(settings, "EVENTS_QUEUE_SIZE", 100)
+        )
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscribers.pop(subscription.user_id, None)
+
+    def listening(self, user_id):
+        """Whether an event for the user could reach anyone."""
+        return user_id in self._subscribers
+
+    def publish(self, user_id, message):
+        self.deliver(user_id, message)
+
+    def deliver(self, user_id, message):
+        """Hand ``message`` to the user's subscribers; safe from any thread."""
+        with self._lock:
+            subscriptions = list(self._subscribers.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:
+                # Its event loop has been closed.
+                self.unsubscribe(subscription)
+
+
+class PostgresBroker(LocalBroker):
+    """
+    Publishes with ``pg_notify`` and LISTENs on one connection per process,
+    in a background thread started by the first subscription.
+    """
+
+    def __init__(self, using="default"):
+        super().__init__()
+        self.using = using
+        self._listener = None
+
+    def subscribe(self, user_id):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name="events-listener", daemon=True
+                )
+                self._listener.start()
+        return super().subscribe(user_id)
+
+    def listening(self, user_id):
+        return True
+
+    def publish(self, user_id, message):
+        if len(message.encode()) > MAX_NOTIFY_PAYLOAD:
+            message = CATCH_UP
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, %s)", [CHANNEL, f"{user_id}:{message}"]
+            )
+
+    def _listen(self):
+        wrapper = connections[self.using]
+        while True:
+            try:
+                connection = wrapper.get_new_connection(wrapper.get_connection_params())
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                while True:
+                    if select.select([connection], [], [], 5) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        notify = connection.notifies.pop(0)
+                        user_id, _, message = notify.payload.partition(":")
+                        self.deliver(int(user_id), message)
+            except Exception:
+                logger.exception("Event listener failed, reconnecting")
+                time.sleep(1)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(
+            getattr(settings, "EVENTS_BACKEND", "app.events.LocalBroker")
+        )()
+    return _broker
+
+
+def reset():
+    global _broker
+    _broker = None
+
+
+def _publish_on_commit(user_id, event):
+    broker = get_broker()
+    if not broker.listening(user_id):
+        return
+
+    def publish():
+        try:
+            # get_totals only reads the user's id; nothing is loaded.
+            user = get_user_model()(pk=user_id)
+            event["balance"] = ledger.get_totals(user)
+            broker.publish(user_id, encode(event))
+        except Exception:
+            # The write has committed; a lost event is caught up later.
+            logger.exception("Could not publish an event for user %s", user_id)
+
+    transaction.on_commit(publish)
+
+
+def transaction_saved(instance):
+    if get_broker().listening(instance.user_id):
+        _publish_on_commit(
+            instance.user_id,
+            {
+                "type": "upsert",
+                "seq": instance.change_seq,
+                "transaction": TransactionSerializer(instance).data,
+            },
+        )
+
+
+def transaction_deleted(transaction_id, user_id, seq):
+    _publish_on_commit(user_id, {"type": "delete", "seq": seq, "id": transaction_id})
+
+
+def transactions_changed(user_id):
+    _publish_on_commit(user_id, {"type": "changes"})
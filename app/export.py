@@ -0,0 +1,48 @@
+import csv
+
+from django.conf import settings
+
+from .renderers import FastJSONRenderer
+from .serializers import TransactionListSerializer
+
+COLUMNS = ["id", "category", "title", "amount", "created_at", "month"]
+
+
+class Echo:
+    """File-like object whose write() hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def chunk_size():
+    return getattr(settings, "TRANSACTION_EXPORT_CHUNK_SIZE", 2000)
+
+
+def iter_rows(queryset):
+    """
+    Format the ``.values()`` rows of ``queryset`` (see views.list_rows)
+    exactly as the list endpoint does.
+    """
+    serializer = TransactionListSerializer()
+    for row in queryset.iterator(chunk_size=chunk_size()):
+        yield serializer.to_representation(row)
+
+
+def iter_csv(queryset):
+    writer = csv.writer(Echo())
+    yield writer.writerow(COLUMNS)
+    for row in iter_rows(queryset):
+        yield writer.writerow([row[column] for column in COLUMNS])
+
+
+def iter_ndjson(queryset):
+    renderer = FastJSONRenderer()
+    for row in iter_rows(queryset):
+        yield renderer.render(row) + b"\n"
+
+
+FORMATS = {
+    "csv": (iter_csv, "text/csv", "csv"),
+    "ndjson": (iter_ndjson, "application/x-ndjson", "ndjson"),
+}
@@ -1,8 +1,51 @@
+from datetime import datetime
+
+from django.utils import timezone
+from django_filters import DateTimeFilter, FilterSet, NumberFilter
+
 from .models import Transaction
-from django_filters import FilterSet, NumberFilter
+
+
+def month_range(year, month):
+    """Return the half-open ``[start, end)`` datetimes covering a month."""
+    start = timezone.make_aware(datetime(year, month, 1))
+    if month == 12:
+        end = timezone.make_aware(datetime(year + 1, 1, 1))
+    else:
+        end = timezone.make_aware(datetime(year, month + 1, 1))
+    return start, end
+
+
 class TransactionFilter(FilterSet):
-    month = NumberFilter(field_name='created_at__month', label="month in number format")
-    
+    year = NumberFilter(
+        method="filter_period", min_value=1, max_value=9998, label="year"
+    )
+    month = NumberFilter(
+        method="filter_period",
+        min_value=1,
+        max_value=12,
+        label="month in number format (defaults to the current year)",
+    )
+    created_after = DateTimeFilter(field_name="created_at", lookup_expr="gte")
+    created_before = DateTimeFilter(field_name="created_at", lookup_expr="lt")
+
     class Meta:
         model = Transaction
-        fields = ['month', 'category']
\ No newline at end of file
+        fields = ['year', 'month', 'category', 'created_after', 'created_before']
+
+    def filter_period(self, queryset, name, value):
+        # year and month are turned into a single created_at range so the
+        # (user, created_at) index can serve the lookup; EXTRACT() can't.
+        data = self.form.cleaned_data
+        year, month = data.get("year"), data.get("month")
+        if name == "year" and month is not None:
+            return queryset
+
+        if month is None:
+            start = timezone.make_aware(datetime(int(year), 1, 1))
+            end = timezone.make_aware(datetime(int(year) + 1, 1, 1))
+        else:
+            if year is None:
+                year = timezone.localdate().year
+            start, end = month_range(int(year), int(month))
+        return queryset.filter(created_at__gte=start, created_at__lt=end)
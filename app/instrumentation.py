@@ -0,0 +1,234 @@
+"""
+Lightweight per-request timing, cheap enough to leave on in production.
+
+RequestTimingMiddleware samples ``REQUEST_TIMING_SAMPLE_RATE`` of the
+requests. For those it records every SQL statement the request runs,
+plus the phases timed with ``timed()`` (TimedViewMixin adds the view and
+serializer phases). The result is logged as one JSON line on the
+``app.instrumentation`` logger and, when ``REQUEST_TIMING_HEADER`` is
+set, sent back in a ``Server-Timing`` header.
+
+A statement shape (the SQL with its parameters left as placeholders)
+that runs ``REQUEST_TIMING_REPEATED_QUERIES`` times or more in one
+request is reported as a likely N+1 and logged at WARNING.
+
+Every connection carries one execute wrapper that records into the
+timings of the request whose context is current, so the middleware works
+the same under ASGI: queries a request runs through sync_to_async, in
+Django's sync thread or a worker thread, are counted for that request
+only.
+"""
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("request_timings", default=None)
+
+_PLACEHOLDER_LIST = re.compile(r"%s(?:\s*,\s*%s)+")
+
+
+def query_shape(sql):
+    """Collapse ``IN (%s, %s, ...)`` so lists of any length share a shape."""
+    return _PLACEHOLDER_LIST.sub("%s, ...", sql)
+
+
+class Timings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = None
+        self.queries = []
+        self.phases = {}
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    @property
+    def db_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def slowest(self, count):
+        queries = sorted(self.queries, key=lambda query: query[1], reverse=True)
+        return queries[:count]
+
+    def repeated(self, threshold):
+        shapes = Counter(query_shape(sql) for sql, _ in self.queries)
+        return [(shape, n) for shape, n in shapes.most_common() if n >= threshold]
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to ``phase`` of the current request."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - start)
+
+
+def _record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.record_query(execute, sql, params, many, context)
+
+
+def install(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    install(connection)
+
+
+connection_created.connect(_on_connection_created)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def server_timing(timings, repeated):
+    entries = [f'db;dur={_ms(timings.db_time)};desc="{len(timings.queries)} queries"']
+    entries += [f"{phase};dur={_ms(value)}" for phase, value in timings.phases.items()]
+    if repeated:
+        entries.append(f'nplusone;desc="{len(repeated)} repeated query shapes"')
+    entries.append(f"total;dur={_ms(timings.total)}")
+    return ", ".join(entries)
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = asyncio.iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        rate = getattr(settings, "REQUEST_TIMING_SAMPLE_RATE", 0)
+        return rate and random.random() < rate
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        # Connections opened before this module was imported.
+        for alias in connections:
+            install(connections[alias])
+        timings = Timings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        timings.finish()
+        self.report(request, response, timings)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        timings = Timings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        timings.finish()
+        self.report(request, response, timings)
+        return response
+
+    def report(self, request, response, timings):
+        slow_count = getattr(settings, "REQUEST_TIMING_SLOW_QUERIES", 3)
+        threshold = getattr(settings, "REQUEST_TIMING_REPEATED_QUERIES", 5)
+        repeated = timings.repeated(threshold)
+
+        if getattr(settings, "REQUEST_TIMING_HEADER", False):
+            response["Server-Timing"] = server_timing(timings, repeated)
+
+        match = request.resolver_match
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "total_ms": _ms(timings.total),
+            "db_ms": _ms(timings.db_time),
+            "queries": len(timings.queries),
+            **{f"{phase}_ms": _ms(value) for phase, value in timings.phases.items()},
+            "slowest": [
+                {"sql": sql[:500], "ms": _ms(duration)}
+                for sql, duration in timings.slowest(slow_count)
+            ],
+            "repeated": [{"sql": sql[:500], "count": n} for sql, n in repeated],
+        }
+        logger.log(
+            logging.WARNING if repeated else logging.INFO,
+            json.dumps(record),
+            extra={"timing": record},
+        )
+
+
+class _TimedSerializer:
+    """Proxy timing ``.data`` as the serialize phase."""
+
+    def __init__(self, serializer):
+        object.__setattr__(self, "_serializer", serializer)
+
+    def __getattr__(self, name):
+        return getattr(self._serializer, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._serializer, name, value)
+
+    @property
+    def data(self):
+        with timed("serialize"):
+            return self._serializer.data
+
+
+class TimedViewMixin:
+    """Report the view and serializer phases of a DRF view."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with timed("view"):
+            return super().dispatch(request, *args, **kwargs)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if _current.get() is None:
+            return serializer
+        return _TimedSerializer(serializer)
@@ -0,0 +1,140 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+
+from . import partitions
+from .models import Balance, Category
+
+INCOME = "income"
+EXPENSE = "expense"
+
+ZERO = Decimal("0")
+
+
+def contribution(category_name, amount):
+    """Return the (income, expense) a single transaction adds to its owner."""
+    amount = Decimal(amount or 0)
+    if category_name == INCOME:
+        return amount, ZERO
+    if category_name == EXPENSE:
+        return ZERO, amount
+    return ZERO, ZERO
+
+
+def contributions(amounts):
+    """
+    Sum ``(category_id, amount)`` pairs into the (income, expense) they add.
+
+    Names come from the database rather than app.category_cache, which
+    can lag behind a rename made in another worker.
+    """
+    amounts = list(amounts)
+    names = dict(
+        Category.objects.filter(pk__in={pk for pk, _ in amounts}).values_list(
+            "id", "name"
+        )
+    )
+    income = expense = ZERO
+    for category_id, amount in amounts:
+        row_income, row_expense = contribution(names.get(category_id), amount)
+        income += row_income
+        expense += row_expense
+    return income, expense
+
+
+def apply_delta(user_id, income=ZERO, expense=ZERO, create=True):
+    """
+    Shift the stored totals of a user by the given amounts and bump the
+    user's data version (see app.versioning), even when both are zero.
+
+    Pass ``create=False`` when removing money so a user that is being
+    deleted (and whose ledger row is already gone) is not given a new one.
+    """
+    balance = Balance.objects.filter(user_id=user_id)
+    values = dict(
+        income=F("income") + income,
+        expense=F("expense") + expense,
+        balance=F("balance") + income - expense,
+        version=F("version") + 1,
+    )
+    # The row exists after a user's first write; only then is it created.
+    if not balance.update(**values) and create:
+        Balance.objects.get_or_create(user_id=user_id)
+        balance.update(**values)
+
+
+def get_totals(user):
+    """Read the stored income, expense and balance of a user."""
+    if not user.is_authenticated:
+        return {"income": ZERO, "expense": ZERO, "balance": ZERO}
+    totals = (
+        Balance.objects.filter(user_id=user.id)
+        .values("income", "expense", "balance")
+        .first()
+    )
+    return totals or {"income": ZERO, "expense": ZERO, "balance": ZERO}
+
+
+def _totals_expressions():
+    return {
+        name: Sum(
+            Case(
+                When(category__name=name, then=F("amount")),
+                default=Value(0),
+                output_field=DecimalField(),
+            )
+        )
+        for name in (INCOME, EXPENSE)
+    }
+
+
+def rebuild(user_ids=None, commit=True):
+    """
+    Recompute every ledger row from the raw Transaction table (and the
+    archive, see app.partitions).
+
+    Returns the list of user ids whose stored totals did not match.
+    """
+    expected = {}
+    for rows in partitions.transaction_sources():
+        if user_ids is not None:
+            rows = rows.filter(user_id__in=user_ids)
+        totals = rows.order_by().values("user_id").annotate(**_totals_expressions())
+        for row in totals:
+            income, expense = expected.get(row["user_id"], (ZERO, ZERO))
+            expected[row["user_id"]] = (
+                income + (row["income"] or ZERO),
+                expense + (row["expense"] or ZERO),
+            )
+
+    stored = Balance.objects.all()
+    if user_ids is not None:
+        stored = stored.filter(user_id__in=user_ids)
+    current = {
+        row["user_id"]: (row["income"], row["expense"], row["balance"])
+        for row in stored.values("user_id", "income", "expense", "balance")
+    }
+
+    mismatched = []
+    for user_id in set(expected) | set(current):
+        income, expense = expected.get(user_id, (ZERO, ZERO))
+        if current.get(user_id) != (income, expense, income - expense):
+            mismatched.append(user_id)
+
+    if commit and mismatched:
+        with transaction.atomic():
+            for user_id in mismatched:
+                income, expense = expected.get(user_id, (ZERO, ZERO))
+                Balance.objects.update_or_create(
+                    user_id=user_id,
+                    defaults={
+                        "income": income,
+                        "expense": expense,
+                        "balance": income - expense,
+                    },
+                )
+                Balance.objects.filter(user_id=user_id).update(
+                    version=F("version") + 1
+                )
+    return sorted(mismatched)
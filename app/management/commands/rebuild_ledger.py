@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app import ledger
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the per-user balance ledger from the Transaction table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            dest="user_ids",
+            help="Only process the given user id (can be repeated).",
+        )
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Report mismatched ledger rows without changing them.",
+        )
+
+    def handle(self, *args, **options):
+        verify = options["verify"]
+        mismatched = ledger.rebuild(user_ids=options["user_ids"], commit=not verify)
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS("Ledger is consistent."))
+            return
+
+        ids = ", ".join(str(user_id) for user_id in mismatched)
+        if verify:
+            raise CommandError(f"Ledger mismatch for users: {ids}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt ledger for {len(mismatched)} user(s): {ids}")
+        )
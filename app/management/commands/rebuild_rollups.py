@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from app import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly per-category rollups from the Transaction table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            dest="user_ids",
+            help="Only process the given user id (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        count = rollups.rebuild(user_ids=options["user_ids"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} rollup row(s)."))
@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from app import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Manage the monthly partitions of the Transaction table on "
+        "PostgreSQL: enable/disable partitioning, create upcoming "
+        "partitions, list them or archive old ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "action", choices=["enable", "disable", "ensure", "list", "archive"]
+        )
+        parser.add_argument(
+            "--before",
+            help="archive: move the months before YYYY-MM.",
+        )
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            help="ensure: months ahead to create (TRANSACTION_PARTITIONS_AHEAD).",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Partitioning is only available on PostgreSQL.")
+        action = options["action"]
+        partitioned = partitions.is_partitioned()
+
+        if action == "enable":
+            if partitioned:
+                raise CommandError("The Transaction table is already partitioned.")
+            partitions.convert(connection, partitioned=True)
+        elif action == "disable":
+            if not partitioned:
+                raise CommandError("The Transaction table is not partitioned.")
+            partitions.convert(connection, partitioned=False)
+        elif not partitioned:
+            raise CommandError("The Transaction table is not partitioned.")
+        elif action == "ensure":
+            for name in partitions.ensure_ahead(options["ahead"]):
+                self.stdout.write(f"Created {name}.")
+        elif action == "list":
+            for name, bounds in partitions.list_partitions():
+                self.stdout.write(f"{name} {bounds}")
+        else:
+            if not options["before"]:
+                raise CommandError("archive needs --before YYYY-MM.")
+            try:
+                before = datetime.strptime(options["before"], "%Y-%m")
+            except ValueError:
+                raise CommandError("--before must look like YYYY-MM.")
+            archived = partitions.archive(before.replace(tzinfo=timezone.utc))
+            for name, rows in archived:
+                self.stdout.write(f"Archived {rows} row(s) from {name}.")
+        self.stdout.write(self.style.SUCCESS("Done."))
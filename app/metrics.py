@@ -0,0 +1,298 @@
+"""
+Request and database metrics in the Prometheus text format, served at
+``/metrics``.
+
+MetricsMiddleware counts requests and their latency per route (the URL
+name, so paths with ids share a series), method and status, the SQL
+statements they run, and how often requests found a database connection
+already open versus a new one being opened. Queries are counted by one
+execute wrapper on every connection, into the counter of the request
+whose context is current, so requests are told apart under ASGI too.
+
+Without ``METRICS_TOKEN`` only loopback and private addresses may read
+``/metrics``; with it, scrapers send it as a bearer token.
+
+Counts live in memory and recording one is a dict update under a lock.
+With several worker processes, set ``METRICS_DIR`` to a directory shared
+by them: each process writes a snapshot of its own counts there at most
+every ``METRICS_FLUSH_INTERVAL`` seconds, and ``/metrics`` adds up the
+snapshots of every process, including ones that have exited, so counters
+never go backwards. Empty the directory when deploying.
+"""
+import asyncio
+import bisect
+import ipaddress
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+COUNTERS = {
+    "http_requests_total": "Requests by route, method and status.",
+    "db_queries_total": "SQL statements run by requests, by route.",
+    "db_connections_opened_total": "Database connections opened.",
+    "db_connections_reused_total": "Requests that queried an already open connection.",
+}
+HISTOGRAM = "http_request_duration_seconds"
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.counters = {}
+        # labels -> per-bucket counts (the last one is +Inf) then the sum.
+        self.histograms = {}
+        self.flushed_at = 0
+
+    def _check_fork(self):
+        # A forked worker starts with a copy of its parent's counts.
+        if os.getpid() != self.pid:
+            self.reset()
+
+    def inc(self, name, labels, amount=1):
+        with self.lock:
+            self._check_fork()
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + amount
+        self.maybe_flush()
+
+    def observe(self, labels, seconds, queries):
+        with self.lock:
+            self._check_fork()
+            key = ("http_requests_total", labels)
+            self.counters[key] = self.counters.get(key, 0) + 1
+            route = (labels[0],)
+            key = ("db_queries_total", route)
+            self.counters[key] = self.counters.get(key, 0) + queries
+            values = self.histograms.get(labels)
+            if values is None:
+                values = self.histograms[labels] = [0] * (len(LATENCY_BUCKETS) + 2)
+            values[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            values[-1] += seconds
+        self.maybe_flush()
+
+    def snapshot(self):
+        with self.lock:
+            self._check_fork()
+            return {
+                "counters": [
+                    [name, list(labels), value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                "histograms": [
+                    [list(labels), list(values)]
+                    for labels, values in self.histograms.items()
+                ],
+            }
+
+    def maybe_flush(self):
+        directory = getattr(settings, "METRICS_DIR", None)
+        if not directory:
+            return
+        now = time.monotonic()
+        interval = getattr(settings, "METRICS_FLUSH_INTERVAL", 1)
+        if now - self.flushed_at < interval:
+            return
+        if not self.flush_lock.acquire(blocking=False):
+            return
+        try:
+            self.flushed_at = now
+            path = Path(directory) / f"metrics-{os.getpid()}.json"
+            temporary = path.with_suffix(".tmp")
+            temporary.write_text(json.dumps(self.snapshot()))
+            os.replace(temporary, path)
+        finally:
+            self.flush_lock.release()
+
+
+registry = Registry()
+
+_counter = ContextVar("request_queries", default=None)
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.queried = set()
+        self.opened = set()
+
+    def reused(self):
+        return self.queried - self.opened
+
+
+def _count_query(execute, sql, params, many, context):
+    counter = _counter.get()
+    if counter is not None:
+        counter.count += 1
+        counter.queried.add(context["connection"].alias)
+    return execute(sql, params, many, context)
+
+
+def install(connection):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    install(connection)
+    registry.inc("db_connections_opened_total", (connection.alias,))
+    counter = _counter.get()
+    if counter is not None:
+        counter.opened.add(connection.alias)
+
+
+connection_created.connect(_on_connection_created)
+
+
+def collect():
+    """Merge this process's counts with the other processes' snapshots."""
+    snapshots = [registry.snapshot()]
+    directory = getattr(settings, "METRICS_DIR", None)
+    if directory:
+        own = f"metrics-{os.getpid()}.json"
+        for path in Path(directory).glob("metrics-*.json"):
+            if path.name == own:
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(labels))
+            counters[key] = counters.get(key, 0) + value
+        for labels, values in snapshot["histograms"]:
+            merged = histograms.setdefault(tuple(labels), [0] * len(values))
+            for index, value in enumerate(values):
+                merged[index] += value
+    return counters, histograms
+
+
+LABEL_NAMES = {
+    "http_requests_total": ("route", "method", "status"),
+    "db_queries_total": ("route",),
+    "db_connections_opened_total": ("alias",),
+    "db_connections_reused_total": ("alias",),
+    HISTOGRAM: ("route", "method", "status"),
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(name, values, extra=()):
+    pairs = list(zip(LABEL_NAMES[name], values)) + list(extra)
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def render():
+    counters, histograms = collect()
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{name}{_labels(name, labels)} {value}")
+
+    lines += [
+        f"# HELP {HISTOGRAM} Request latency by route, method and status.",
+        f"# TYPE {HISTOGRAM} histogram",
+    ]
+    bounds = [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+    for labels, values in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(bounds, values):
+            cumulative += count
+            lines.append(
+                f"{HISTOGRAM}_bucket{_labels(HISTOGRAM, labels, [('le', bound)])}"
+                f" {cumulative}"
+            )
+        lines.append(f"{HISTOGRAM}_sum{_labels(HISTOGRAM, labels)} {values[-1]}")
+        lines.append(f"{HISTOGRAM}_count{_labels(HISTOGRAM, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def is_internal(address):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return address.is_loopback or address.is_private
+
+
+def metrics_view(request):
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if token:
+        allowed = constant_time_compare(
+            request.META.get("HTTP_AUTHORIZATION", ""), f"Bearer {token}"
+        )
+    else:
+        allowed = is_internal(request.META.get("REMOTE_ADDR", ""))
+    if not allowed:
+        return HttpResponse(status=403)
+    return HttpResponse(render(), content_type="text/plain; version=0.0.4")
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = asyncio.iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        # Connections opened before this module was imported.
+        for alias in connections:
+            install(connections[alias])
+        counter = _QueryCounter()
+        token = _counter.set(counter)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _counter.reset(token)
+        self.record(request, response, counter, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        counter = _QueryCounter()
+        token = _counter.set(counter)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _counter.reset(token)
+        self.record(request, response, counter, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, counter, elapsed):
+        for alias in counter.reused():
+            registry.inc("db_connections_reused_total", (alias,))
+        match = request.resolver_match
+        route = match.view_name if match else "unmatched"
+        labels = (route, request.method, str(response.status_code))
+        registry.observe(labels, elapsed, counter.count)
@@ -0,0 +1,76 @@
+# Generated by Django 5.0.2 on 2026-10-17 14:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+
+
+def backfill_balances(apps, schema_editor):
+    Transaction = apps.get_model("app", "Transaction")
+    Balance = apps.get_model("app", "Balance")
+
+    totals = (
+        Transaction.objects.order_by()
+        .values("user_id")
+        .annotate(
+            **{
+                name: Sum(
+                    Case(
+                        When(category__name=name, then=F("amount")),
+                        default=Value(0),
+                        output_field=DecimalField(),
+                    )
+                )
+                for name in ("income", "expense")
+            }
+        )
+    )
+    Balance.objects.bulk_create(
+        Balance(
+            user_id=row["user_id"],
+            income=row["income"] or 0,
+            expense=row["expense"] or 0,
+            balance=(row["income"] or 0) - (row["expense"] or 0),
+        )
+        for row in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("app", "0009_alter_user_email_alter_user_username"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Balance",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="balance",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "income",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "expense",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "balance",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+            ],
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.2 on 2026-10-17 14:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_balance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='transaction_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'category', '-created_at'], name='transaction_user_cat_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.0.2 on 2026-10-17 14:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    Transaction = apps.get_model("app", "Transaction")
+    MonthlyRollup = apps.get_model("app", "MonthlyRollup")
+
+    tz = timezone.get_current_timezone()
+    totals = (
+        Transaction.objects.order_by()
+        .annotate(
+            year=ExtractYear("created_at", tzinfo=tz),
+            month=ExtractMonth("created_at", tzinfo=tz),
+        )
+        .values("user_id", "year", "month", "category_id")
+        .annotate(total=Sum("amount"), count=Count("id"))
+    )
+    MonthlyRollup.objects.bulk_create(
+        [MonthlyRollup(**row) for row in totals], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('app', '0011_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['year', 'month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'year', 'month', 'category'), name='unique_monthly_rollup'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
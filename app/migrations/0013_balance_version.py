@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-17 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_monthlyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='balance',
+            name='modified',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='balance',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-17 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_balance_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_generation',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.0.2 on 2026-10-17 15:40
+
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE app_transaction ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple', coalesce(title, ''))) STORED
+    """,
+    """
+    CREATE INDEX transaction_search_idx ON app_transaction
+    USING gin (search_vector)
+    """,
+    """
+    CREATE INDEX transaction_title_trgm_idx ON app_transaction
+    USING gin (title gin_trgm_ops)
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS transaction_title_trgm_idx",
+    "DROP INDEX IF EXISTS transaction_search_idx",
+    "ALTER TABLE app_transaction DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE app_transaction_fts USING fts5(
+        title, content='app_transaction', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER app_transaction_fts_insert AFTER INSERT ON app_transaction
+    BEGIN
+        INSERT INTO app_transaction_fts(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    """
+    CREATE TRIGGER app_transaction_fts_delete AFTER DELETE ON app_transaction
+    BEGIN
+        INSERT INTO app_transaction_fts(app_transaction_fts, rowid, title)
+        VALUES ('delete', old.id, old.title);
+    END
+    """,
+    """
+    CREATE TRIGGER app_transaction_fts_update AFTER UPDATE OF title
+    ON app_transaction
+    BEGIN
+        INSERT INTO app_transaction_fts(app_transaction_fts, rowid, title)
+        VALUES ('delete', old.id, old.title);
+        INSERT INTO app_transaction_fts(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    "INSERT INTO app_transaction_fts(app_transaction_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS app_transaction_fts_update",
+    "DROP TRIGGER IF EXISTS app_transaction_fts_delete",
+    "DROP TRIGGER IF EXISTS app_transaction_fts_insert",
+    "DROP TABLE IF EXISTS app_transaction_fts",
+]
+
+STATEMENTS = {
+    "postgresql": (POSTGRES_FORWARD, POSTGRES_BACKWARD),
+    "sqlite": (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def run(index):
+    def execute(apps, schema_editor):
+        statements = STATEMENTS.get(schema_editor.connection.vendor)
+        for statement in statements[index] if statements else []:
+            schema_editor.execute(statement)
+
+    return execute
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0014_user_token_generation"),
+    ]
+
+    # The search column, indexes and FTS table are database specific and
+    # not part of the model; see app/search.py.
+    operations = [
+        migrations.RunPython(run(0), run(1)),
+    ]
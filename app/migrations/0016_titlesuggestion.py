@@ -0,0 +1,64 @@
+# Generated by Django 5.0.2 on 2026-10-17 15:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_suggestions(apps, schema_editor):
+    Transaction = apps.get_model("app", "Transaction")
+    TitleSuggestion = apps.get_model("app", "TitleSuggestion")
+
+    suggestions = {}
+    rows = Transaction.objects.order_by("created_at").values_list(
+        "user_id", "title", "category_id", "created_at"
+    )
+    for user_id, title, category_id, created_at in rows.iterator():
+        normalized = " ".join((title or "").lower().split())[:255]
+        if not normalized:
+            continue
+        suggestion = suggestions.setdefault(
+            (user_id, normalized),
+            TitleSuggestion(
+                user_id=user_id, normalized=normalized, category_counts={}
+            ),
+        )
+        counts = suggestion.category_counts
+        counts[str(category_id)] = counts.get(str(category_id), 0) + 1
+        suggestion.count += 1
+        suggestion.title = title.strip()[:255]
+        suggestion.last_used = created_at
+        suggestion.category_id = int(max(counts, key=counts.get))
+    TitleSuggestion.objects.bulk_create(suggestions.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_transaction_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('normalized', models.CharField(max_length=255)),
+                ('title', models.CharField(max_length=255)),
+                ('category_counts', models.JSONField(default=dict)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('last_used', models.DateTimeField()),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='titlesuggestion',
+            index=models.Index(fields=['user', 'normalized'], name='suggestion_prefix_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddConstraint(
+            model_name='titlesuggestion',
+            constraint=models.UniqueConstraint(fields=('user', 'normalized'), name='unique_title_suggestion'),
+        ),
+        migrations.RunPython(backfill_suggestions, migrations.RunPython.noop),
+    ]
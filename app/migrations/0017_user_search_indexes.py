@@ -0,0 +1,41 @@
+# Generated by Django 5.0.2 on 2026-10-17 18:20
+
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX user_email_lower_idx ON app_user
+    (lower(email) text_pattern_ops)
+    """,
+    """
+    CREATE INDEX user_username_lower_idx ON app_user
+    (lower(username) text_pattern_ops)
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS user_username_lower_idx",
+    "DROP INDEX IF EXISTS user_email_lower_idx",
+]
+
+
+def run(statements):
+    def execute(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            for statement in statements:
+                schema_editor.execute(statement)
+
+    return execute
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0016_titlesuggestion"),
+    ]
+
+    # Serve the admin's prefix search on users (see CustomUser in
+    # app/admin.py) from an index.
+    operations = [
+        migrations.RunPython(run(POSTGRES_FORWARD), run(POSTGRES_BACKWARD)),
+    ]
@@ -0,0 +1,118 @@
+# Generated by Django 5.0.2 on 2026-10-17 19:05
+
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import migrations
+
+# The SQL of app.partitions.convert() as it stood when this migration was
+# written, so later changes to that module can't change what it does.
+TABLE = "app_transaction"
+OLD = "app_transaction_old"
+
+
+def month_start(value):
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def next_month(start):
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def table_layout(cursor):
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() "
+        "AND tablename = %s AND indexname <> %s",
+        [TABLE, f"{TABLE}_pkey"],
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+        [TABLE],
+    )
+    foreign_keys = cursor.fetchall()
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = %s "
+        "AND is_generated = 'NEVER' ORDER BY ordinal_position",
+        [TABLE],
+    )
+    columns = ", ".join(row[0] for row in cursor.fetchall())
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+    sequence = cursor.fetchone()[0]
+    return indexes, foreign_keys, columns, sequence
+
+
+def convert(cursor, partitioned):
+    indexes, foreign_keys, columns, sequence = table_layout(cursor)
+    cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {OLD}")
+    cursor.execute(f"ALTER TABLE {OLD} RENAME CONSTRAINT {TABLE}_pkey TO {OLD}_pkey")
+    like = f"LIKE {OLD} INCLUDING DEFAULTS INCLUDING GENERATED"
+    if partitioned:
+        cursor.execute(f"CREATE TABLE {TABLE} ({like}) PARTITION BY RANGE (created_at)")
+        cursor.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, created_at)")
+        now = datetime.now(timezone.utc)
+        cursor.execute(f"SELECT min(created_at) FROM {OLD}")
+        start = month_start(cursor.fetchone()[0] or now)
+        last = month_start(now)
+        for _ in range(getattr(settings, "TRANSACTION_PARTITIONS_AHEAD", 3)):
+            last = next_month(last)
+        while start <= last:
+            cursor.execute(
+                f"CREATE TABLE {TABLE}_p{start:%Y%m} PARTITION OF {TABLE} "
+                "FOR VALUES FROM (%s) TO (%s)",
+                [start, next_month(start)],
+            )
+            start = next_month(start)
+    else:
+        cursor.execute(f"CREATE TABLE {TABLE} ({like})")
+        cursor.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id)")
+    cursor.execute(f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {OLD}")
+    if sequence:
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id")
+    cursor.execute(f"DROP TABLE {OLD} CASCADE")
+    for name, definition in foreign_keys:
+        cursor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}")
+    for definition in indexes:
+        cursor.execute(definition)
+    cursor.execute(f"ANALYZE {TABLE}")
+
+
+def partition(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql" and getattr(
+        settings, "TRANSACTION_PARTITIONING", False
+    ):
+        with connection.cursor() as cursor:
+            convert(cursor, partitioned=True)
+
+
+def unpartition(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass(%s))",
+            [TABLE],
+        )
+        if cursor.fetchone()[0]:
+            convert(cursor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0017_user_search_indexes"),
+    ]
+
+    # Only does anything on PostgreSQL with TRANSACTION_PARTITIONING set;
+    # the partitions are not part of the model, see app/partitions.py.
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
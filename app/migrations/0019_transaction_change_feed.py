@@ -0,0 +1,77 @@
+# Generated by Django 5.0.2 on 2026-10-17 18:40
+
+from importlib import import_module
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_change_seqs(apps, schema_editor):
+    # Number existing rows after each owner's current version, one each,
+    # so a first sync from 0 can be paged like any other.
+    Balance = apps.get_model("app", "Balance")
+    Transaction = apps.get_model("app", "Transaction")
+
+    user_ids = Transaction.objects.order_by().values_list("user_id", flat=True)
+    for user_id in user_ids.distinct().iterator():
+        balance, _ = Balance.objects.get_or_create(user_id=user_id)
+        ids = Transaction.objects.filter(user_id=user_id).order_by("id")
+        objs = [
+            Transaction(pk=pk, change_seq=balance.version + index)
+            for index, pk in enumerate(ids.values_list("id", flat=True), 1)
+        ]
+        Transaction.objects.bulk_update(objs, ["change_seq"], batch_size=1000)
+        Balance.objects.filter(user_id=user_id).update(
+            version=balance.version + len(objs)
+        )
+
+
+def restore_sqlite_search(apps, schema_editor):
+    # SQLite adds the column by rebuilding app_transaction, which drops the
+    # full-text triggers of 0015; set the FTS table up again.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    search = import_module("app.migrations.0015_transaction_search")
+    for statement in search.SQLITE_BACKWARD + search.SQLITE_FORWARD:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0018_transaction_partitioning'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_sqlite_search),
+        migrations.CreateModel(
+            name='TransactionTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_id', models.BigIntegerField()),
+                ('change_seq', models.PositiveBigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='change_seq',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'change_seq'], name='transaction_user_change_idx'),
+        ),
+        migrations.AddField(
+            model_name='transactiontombstone',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='transactiontombstone',
+            index=models.Index(fields=['user', 'change_seq'], name='tombstone_user_change_idx'),
+        ),
+        migrations.RunPython(restore_sqlite_search, migrations.RunPython.noop),
+        migrations.RunPython(backfill_change_seqs, migrations.RunPython.noop),
+    ]
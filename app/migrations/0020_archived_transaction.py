@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-17 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0019_transaction_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=7)),
+                ('created_at', models.DateTimeField()),
+                ('last_updated', models.DateField()),
+            ],
+            options={
+                'db_table': 'app_transaction_archive',
+                'managed': False,
+            },
+        ),
+    ]
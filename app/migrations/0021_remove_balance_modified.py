@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-17 20:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0020_archived_transaction'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='balance',
+            name='modified',
+        ),
+    ]
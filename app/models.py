@@ -1,18 +1,57 @@
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.cache import cache
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
 
 
 class User(AbstractUser):
     username = models.CharField(unique=False, max_length=255)
     email = models.EmailField(unique=True)
+    # Bumped to revoke every signed token issued so far.
+    token_generation = models.PositiveIntegerField(default=0)
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username"]
+    # Saving a change to any of these revokes the user's tokens.
+    TOKEN_FIELDS = ("password", "is_staff", "is_active")
 
     def __str__(self):
         return self.email
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._token_state = {
+            name: value
+            for name, value in zip(field_names, values)
+            if name in cls.TOKEN_FIELDS
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        from .authentication import generation_cache_key
+
+        loaded = getattr(self, "_token_state", {})
+        update_fields = kwargs.get("update_fields")
+        changed = [
+            name
+            for name, value in loaded.items()
+            if getattr(self, name) != value
+            and (update_fields is None or name in update_fields)
+        ]
+        if changed:
+            self.token_generation += 1
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "token_generation"}
+        super().save(*args, **kwargs)
+        if changed:
+            key = generation_cache_key(self.pk)
+            transaction.on_commit(lambda: cache.delete(key))
+        self._token_state = {
+            **loaded,
+            **{name: getattr(self, name) for name in changed},
+        }
+
 
 class Category(models.Model):
     name = models.CharField(max_length=50)
@@ -20,6 +59,12 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    # Renaming income or expense rebuilds the ledgers of its users (see
+    # app.signals), in the same transaction as the rename.
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class Transaction(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -30,9 +75,151 @@ class Transaction(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     last_updated = models.DateField(auto_now=True)
+    # Owner's data version at the last write; see app.changes.
+    change_seq = models.PositiveBigIntegerField(default=0)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="transaction_user_created_idx",
+            ),
+            models.Index(
+                fields=["user", "category", "-created_at"],
+                name="transaction_user_cat_idx",
+            ),
+            models.Index(
+                fields=["user", "change_seq"], name="transaction_user_change_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    # Signal handlers keep Balance and MonthlyRollup in step with every
+    # write; running them inside the same transaction keeps them exact.
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+
+class ArchivedTransaction(models.Model):
+    """
+    Rows moved out of detached partitions (see app.partitions). The table
+    is created by the first archive, so it's not managed by migrations.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    category = models.ForeignKey(
+        Category, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+"
+    )
+    title = models.CharField(max_length=255)
+    amount = models.DecimalField(max_digits=7, decimal_places=2)
+    created_at = models.DateTimeField()
+    last_updated = models.DateField()
+
+    class Meta:
+        managed = False
+        db_table = "app_transaction_archive"
+
+    def __str__(self):
+        return self.title
+
+
+class TransactionTombstone(models.Model):
+    # No database constraint: tombstones can be written while the user is
+    # being deleted, after its own cascade was collected.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_constraint=False
+    )
+    transaction_id = models.BigIntegerField()
+    change_seq = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "change_seq"], name="tombstone_user_change_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} #{self.transaction_id}"
+
+
+class Balance(models.Model):
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="balance",
+    )
+    income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Bumped on every write to the user's transactions; see app.versioning.
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user} ({self.balance})"
+
+
+class MonthlyRollup(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "year", "month", "category"],
+                name="unique_monthly_rollup",
+            )
+        ]
+        ordering = ["year", "month"]
+
+    def __str__(self):
+        return f"{self.user} {self.year}-{self.month:02d} {self.category}"
+
+
+class TitleSuggestion(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    normalized = models.CharField(max_length=255)
+    title = models.CharField(max_length=255)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    # {category_id: uses}, used to pick the most common category.
+    category_counts = models.JSONField(default=dict)
+    count = models.PositiveIntegerField(default=0)
+    last_used = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "normalized"], name="unique_title_suggestion"
+            )
+        ]
+        indexes = [
+            # varchar_pattern_ops lets PostgreSQL use the index for LIKE 'x%'.
+            models.Index(
+                fields=["user", "normalized"],
+                name="suggestion_prefix_idx",
+                opclasses=["int8_ops", "varchar_pattern_ops"],
+            )
+        ]
 
     def __str__(self):
         return self.title
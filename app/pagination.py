@@ -0,0 +1,118 @@
+from django.db.models import Case, Count, DecimalField, Sum, Value, When, Window
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import category_cache, ledger
+
+
+class TransactionCursorPagination(CursorPagination):
+    """
+    Cursor pagination ordered by ``created_at``, newest first.
+
+    DRF's cursor holds the ``created_at`` of the last row sent plus an
+    offset: pages are fetched with ``WHERE created_at <= <position>`` and
+    the rows sharing that timestamp are skipped with OFFSET. ``id`` breaks
+    the ties so they are skipped in the same order on every page; it is not
+    part of the cursor. No COUNT(*) is issued, so a page costs the same
+    wherever it falls, unless many rows share one timestamp.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        # Break ties on the primary key so rows sharing a timestamp or an
+        # amount keep a stable order between pages.
+        if not any(field.lstrip("-") in ("id", "pk") for field in ordering):
+            descending = ordering[0].startswith("-")
+            ordering = (*ordering, "-id" if descending else "id")
+        return ordering
+
+
+class WindowPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination that fetches the page, the total count and the
+    income/expense sums of the whole filtered queryset in one statement,
+    using ``COUNT(*) OVER ()`` / ``SUM(...) OVER ()`` window aggregates.
+
+    The filtered sums are left on ``self.totals`` for the view.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        try:
+            page_number = int(request.query_params.get(self.page_query_param, 1))
+            if page_number < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+
+        offset = (page_number - 1) * page_size
+        rows = list(
+            queryset.annotate(
+                window_count=Window(expression=Count("id")),
+                **{
+                    f"window_{name}": Window(expression=self._sum(name))
+                    for name in (ledger.INCOME, ledger.EXPENSE)
+                },
+            )[offset : offset + page_size]
+        )
+        if not rows and page_number != 1:
+            raise NotFound(self.invalid_page_message)
+
+        # Rows are dicts when the view paginates a .values() queryset.
+        first = rows[0] if rows else {}
+        if not isinstance(first, dict):
+            first = vars(first)
+        income = first.get("window_income") or ledger.ZERO
+        expense = first.get("window_expense") or ledger.ZERO
+        self.count = first.get("window_count", 0)
+        self.totals = {
+            "income": income,
+            "expense": expense,
+            "balance": income - expense,
+        }
+        self.page_number = page_number
+        self.page_size = page_size
+        self.request = request
+        return rows
+
+    @staticmethod
+    def _sum(category_name):
+        return Sum(
+            Case(
+                When(category_id=category_cache.get_id(category_name), then="amount"),
+                default=Value(0),
+                output_field=DecimalField(),
+            )
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.count,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_next_link(self):
+        if self.page_number * self.page_size >= self.count:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
@@ -0,0 +1,271 @@
+"""
+Optional month range partitioning of ``app_transaction`` on PostgreSQL.
+
+With ``TRANSACTION_PARTITIONING`` enabled, migration 0018 (or
+``manage.py transaction_partitions enable`` later on) rebuilds the table
+as ``PARTITION BY RANGE (created_at)`` with one partition per UTC month,
+named ``app_transaction_pYYYYMM``. The primary key becomes
+``(id, created_at)``; the indexes, foreign keys and id sequence are
+carried over. Filters on ``created_at`` ranges (see TransactionFilter)
+let the planner skip other months.
+
+Partitions are created ``TRANSACTION_PARTITIONS_AHEAD`` months ahead by
+``transaction_partitions ensure`` (run it from cron) and, as a fallback,
+before the first write of a month in each process.
+
+``transaction_partitions archive --before YYYY-MM`` detaches older months
+with ``DETACH PARTITION ... CONCURRENTLY`` (PostgreSQL 14+), so live
+queries are not blocked, and moves their rows into the narrower
+``app_transaction_archive`` table (the ArchivedTransaction model).
+Balance, MonthlyRollup and TitleSuggestion keep counting archived rows,
+and their rebuilds read the archive as well as the live table (see
+``transaction_sources()``).
+
+On other databases, or with the setting off, every function here is a
+no-op and the table stays as it is.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import ArchivedTransaction, Transaction
+
+TABLE = "app_transaction"
+ARCHIVE_TABLE = ArchivedTransaction._meta.db_table
+ARCHIVE_COLUMNS = "id, user_id, category_id, title, amount, created_at, last_updated"
+
+_partitioned = {}
+_ensured = set()
+
+
+def enabled(connection):
+    return connection.vendor == "postgresql" and getattr(
+        settings, "TRANSACTION_PARTITIONING", False
+    )
+
+
+def is_partitioned(using="default"):
+    if using not in _partitioned:
+        connection = connections[using]
+        if connection.vendor != "postgresql":
+            _partitioned[using] = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+                    "WHERE partrelid = to_regclass(%s))",
+                    [TABLE],
+                )
+                _partitioned[using] = cursor.fetchone()[0]
+    return _partitioned[using]
+
+
+def transaction_sources(using="default"):
+    """
+    Querysets over every transaction row ever written and not deleted:
+    the archive, once something has been archived, then the live table.
+    """
+    sources = [Transaction.objects.using(using)]
+    if ARCHIVE_TABLE in connections[using].introspection.table_names():
+        sources.insert(0, ArchivedTransaction.objects.using(using))
+    return sources
+
+
+def month_start(value):
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def next_month(start):
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_name(start):
+    return f"{TABLE}_p{start:%Y%m}"
+
+
+def _create_partition(cursor, start, attach=True):
+    name = partition_name(start)
+    cursor.execute("SELECT to_regclass(%s)", [name])
+    if cursor.fetchone()[0] is not None:
+        return False
+    bounds = [start, next_month(start)]
+    if not attach:
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES FROM (%s) TO (%s)",
+            bounds,
+        )
+        return True
+    # CREATE TABLE ... PARTITION OF locks the parent against reads and
+    # writes; ATTACH PARTITION of an empty table only blocks other DDL.
+    cursor.execute(
+        f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING GENERATED)"
+    )
+    cursor.execute(
+        f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+        bounds,
+    )
+    return True
+
+
+def ensure(values, using="default"):
+    """Make sure the partitions holding the given datetimes exist."""
+    months = {month_start(value) for value in values} - _ensured
+    if not months or not is_partitioned(using):
+        return []
+    created = []
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            for start in sorted(months):
+                if _create_partition(cursor, start):
+                    created.append(partition_name(start))
+        transaction.on_commit(lambda: _ensured.update(months), using=using)
+    return created
+
+
+def ensure_ahead(months=None, using="default"):
+    """Create the partitions from this month to ``months`` months ahead."""
+    if months is None:
+        months = getattr(settings, "TRANSACTION_PARTITIONS_AHEAD", 3)
+    start = month_start(timezone.now())
+    starts = [start]
+    for _ in range(months):
+        starts.append(next_month(starts[-1]))
+    return ensure(starts, using=using)
+
+
+def list_partitions(using="default"):
+    """Return ``(name, bounds)`` for each attached partition."""
+    if not is_partitioned(using):
+        return []
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname",
+            [TABLE],
+        )
+        return cursor.fetchall()
+
+
+def _table_layout(cursor):
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() "
+        "AND tablename = %s AND indexname <> %s",
+        [TABLE, f"{TABLE}_pkey"],
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+        [TABLE],
+    )
+    foreign_keys = cursor.fetchall()
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = %s "
+        "AND is_generated = 'NEVER' ORDER BY ordinal_position",
+        [TABLE],
+    )
+    columns = ", ".join(row[0] for row in cursor.fetchall())
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+    sequence = cursor.fetchone()[0]
+    return indexes, foreign_keys, columns, sequence
+
+
+def convert(connection, partitioned):
+    """
+    Rebuild ``app_transaction`` as a partitioned table (or back). This
+    copies every row while holding an exclusive lock on the table, so run
+    it during a maintenance window.
+    """
+    old = f"{TABLE}_old"
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            indexes, foreign_keys, columns, sequence = _table_layout(cursor)
+            cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {old}")
+            cursor.execute(
+                f"ALTER TABLE {old} RENAME CONSTRAINT {TABLE}_pkey TO {old}_pkey"
+            )
+            like = f"LIKE {old} INCLUDING DEFAULTS INCLUDING GENERATED"
+            if partitioned:
+                cursor.execute(
+                    f"CREATE TABLE {TABLE} ({like}) PARTITION BY RANGE (created_at)"
+                )
+                cursor.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, created_at)")
+                cursor.execute(f"SELECT min(created_at) FROM {old}")
+                first = cursor.fetchone()[0] or timezone.now()
+                start = month_start(first)
+                last = month_start(timezone.now())
+                for _ in range(getattr(settings, "TRANSACTION_PARTITIONS_AHEAD", 3)):
+                    last = next_month(last)
+                while start <= last:
+                    _create_partition(cursor, start, attach=False)
+                    start = next_month(start)
+            else:
+                cursor.execute(f"CREATE TABLE {TABLE} ({like})")
+                cursor.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id)")
+            cursor.execute(
+                f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {old}"
+            )
+            if sequence:
+                cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id")
+            cursor.execute(f"DROP TABLE {old} CASCADE")
+            for name, definition in foreign_keys:
+                cursor.execute(
+                    f"ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}"
+                )
+            for definition in indexes:
+                cursor.execute(definition)
+            cursor.execute(f"ANALYZE {TABLE}")
+    _partitioned.pop(connection.alias, None)
+    _ensured.clear()
+
+
+def archive(before, using="default"):
+    """
+    Move the partitions of the months before ``before``'s month into
+    ``app_transaction_archive``. Must run outside a transaction.
+    Returns ``(partition, rows)`` pairs.
+    """
+    if not is_partitioned(using):
+        return []
+    connection = connections[using]
+    cutoff = month_start(before)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE} ("
+            "id bigint NOT NULL, user_id bigint NOT NULL, "
+            "category_id bigint NOT NULL, title varchar(255) NOT NULL, "
+            "amount numeric(7, 2) NOT NULL, created_at timestamptz NOT NULL, "
+            "last_updated date NOT NULL)"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {ARCHIVE_TABLE}_created_brin "
+            f"ON {ARCHIVE_TABLE} USING brin (created_at)"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {ARCHIVE_TABLE}_user_idx "
+            f"ON {ARCHIVE_TABLE} (user_id)"
+        )
+
+    archived = []
+    for name, _ in list_partitions(using):
+        start = datetime.strptime(name[-6:], "%Y%m").replace(tzinfo=dt_timezone.utc)
+        if next_month(start) > cutoff:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name} CONCURRENTLY")
+        with transaction.atomic(using=using):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {ARCHIVE_TABLE} ({ARCHIVE_COLUMNS}) "
+                    f"SELECT {ARCHIVE_COLUMNS} FROM {name}"
+                )
+                archived.append((name, cursor.rowcount))
+                cursor.execute(f"DROP TABLE {name}")
+    return archived
@@ -0,0 +1,201 @@
+"""
+Server push of app.events, mounted in front of Django by backend/asgi.py.
+
+``GET /v1/events/`` answers with a Server-Sent Events stream. A WebSocket
+opened on the same path receives the same JSON events as text messages.
+Clients authenticate with a bearer token or the session cookie. Browsers
+send the cookie with cross-site WebSocket handshakes too, so a handshake
+whose ``Origin`` is not one of ``ALLOWED_HOSTS`` or
+``CSRF_TRUSTED_ORIGINS`` is refused. The first event is
+``{"type": "balance", "balance"}`` with the current totals.
+
+An idle connection is one task waiting on its subscription queue: it
+holds no thread or database connection, so one event loop can keep
+thousands open. SSE streams get a comment line every
+``EVENTS_HEARTBEAT_SECONDS`` so proxies don't close them.
+"""
+import asyncio
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib import auth
+from django.core import signing
+from django.http.request import split_domain_port, validate_host
+from django.utils.http import is_same_domain
+
+from . import events, ledger
+from .async_views import run_in_thread
+from .authentication import user_from_token
+
+PATH = "/v1/events/"
+
+
+def authenticate(headers):
+    """Return the user for the request headers, or None."""
+    authorization = headers.get(b"authorization", b"").decode("latin-1").split()
+    if len(authorization) == 2 and authorization[0].lower() == "bearer":
+        try:
+            return user_from_token(authorization[1])
+        except signing.BadSignature:
+            return None
+
+    cookies = SimpleCookie(headers.get(b"cookie", b"").decode("latin-1"))
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return None
+    engine = import_module(settings.SESSION_ENGINE)
+    # auth.get_user only needs the request's session.
+    request = SimpleNamespace(session=engine.SessionStore(morsel.value))
+    user = auth.get_user(request)
+    return user if user.is_authenticated else None
+
+
+def origin_allowed(origin):
+    """Whether an ``Origin`` header names one of this site's hosts."""
+    parts = urlsplit(origin)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return False
+    allowed_hosts = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not allowed_hosts:
+        # The hosts Django itself accepts in that case.
+        allowed_hosts = [".localhost", "127.0.0.1", "[::1]"]
+    domain, _ = split_domain_port(parts.netloc)
+    if domain and validate_host(domain, allowed_hosts):
+        return True
+    for trusted in settings.CSRF_TRUSTED_ORIGINS:
+        scheme, _, host = trusted.rpartition("://")
+        if scheme in ("", parts.scheme) and is_same_domain(
+            parts.netloc, host.replace("*", "", 1)
+        ):
+            return True
+    return False
+
+
+def balance_event(user):
+    return events.encode({"type": "balance", "balance": ledger.get_totals(user)})
+
+
+async def wait_closed(receive):
+    while True:
+        message = await receive()
+        if message["type"] in ("http.disconnect", "websocket.disconnect"):
+            return
+
+
+async def pump(subscription, receive, send_message, heartbeat=None):
+    """Pass subscription messages to ``send_message`` until the client leaves."""
+    closed = asyncio.ensure_future(wait_closed(receive))
+    getter = None
+    try:
+        while True:
+            if getter is None:
+                getter = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait(
+                {getter, closed},
+                timeout=heartbeat,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if closed in done:
+                return
+            if getter in done:
+                await send_message(getter.result())
+                getter = None
+            else:
+                await send_message(None)
+    finally:
+        closed.cancel()
+        if getter is not None:
+            getter.cancel()
+
+
+class EventStreamApp:
+    """ASGI app serving ``PATH`` and passing every other request to ``app``."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == PATH:
+            await self.server_sent_events(scope, receive, send)
+        elif scope["type"] == "websocket" and scope["path"] == PATH:
+            await self.websocket(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    async def respond(self, send, status, body, headers=()):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", b"application/json"), *headers],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    async def server_sent_events(self, scope, receive, send):
+        if scope["method"] != "GET":
+            await self.respond(send, 405, b'{"detail":"Method not allowed."}')
+            return
+        user = await run_in_thread(authenticate, dict(scope["headers"]))
+        if user is None:
+            body = b'{"detail":"Authentication credentials were not provided."}'
+            await self.respond(send, 401, body, [(b"www-authenticate", b"Bearer")])
+            return
+
+        with events.get_broker().subscribe(user.pk) as subscription:
+            first = await run_in_thread(balance_event, user)
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [
+                        (b"content-type", b"text/event-stream"),
+                        (b"cache-control", b"no-cache"),
+                        # Stop nginx from buffering the stream.
+                        (b"x-accel-buffering", b"no"),
+                    ],
+                }
+            )
+
+            async def send_message(message):
+                chunk = f"data: {message}\n\n" if message else ": ping\n\n"
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk.encode(),
+                        "more_body": True,
+                    }
+                )
+
+            await send_message(first)
+            heartbeat = getattr(settings, "EVENTS_HEARTBEAT_SECONDS", 25)
+            await pump(subscription, receive, send_message, heartbeat)
+
+    async def websocket(self, scope, receive, send):
+        if (await receive())["type"] != "websocket.connect":
+            return
+        headers = dict(scope["headers"])
+        # Clients other than browsers may leave Origin out.
+        if b"origin" in headers and not origin_allowed(
+            headers[b"origin"].decode("latin-1")
+        ):
+            await send({"type": "websocket.close", "code": 4403})
+            return
+        user = await run_in_thread(authenticate, headers)
+        if user is None:
+            await send({"type": "websocket.close", "code": 4403})
+            return
+
+        with events.get_broker().subscribe(user.pk) as subscription:
+            first = await run_in_thread(balance_event, user)
+            await send({"type": "websocket.accept"})
+
+            async def send_message(message):
+                await send({"type": "websocket.send", "text": message})
+
+            await send_message(first)
+            # The server's WebSocket pings keep idle connections alive.
+            await pump(subscription, receive, send_message)
@@ -0,0 +1,230 @@
+"""
+Send read queries of safe requests to read replicas.
+
+``DATABASE_REPLICAS`` lists the DATABASES aliases to read from. During a
+GET/HEAD/OPTIONS request (tracked by ReplicaRoutingMiddleware),
+ReplicaRouter reads from a random replica unless:
+
+* the query runs inside a transaction opened on the primary during the
+  request;
+* it loads a session or a user, so a fresh login or token revocation is
+  seen at once;
+* the requesting user made a write of their own (any unsafe request) in
+  the last ``READ_YOUR_WRITES_SECONDS``, noted in the cache;
+* the replica is more than ``REPLICA_MAX_LAG_SECONDS`` behind, or can't
+  be reached, or hasn't been measured yet.
+
+Writes are noted in the default cache, so replicas are only read from
+when that cache is shared by every worker process (see app.checks).
+
+Lag is measured in a background thread, at most every
+``REPLICA_LAG_CHECK_INTERVAL`` seconds per replica and process, so a
+request never waits on a replica that is down. A measurement that is
+three intervals old (the probe itself is stuck) counts as unreachable.
+
+Writes, and everything outside a request (commands, shell), always use
+``default``. Locally two SQLite files work: add a second alias pointing
+at a copy of the database and list it in ``DATABASE_REPLICAS``.
+"""
+import asyncio
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.functional import SimpleLazyObject, empty
+
+from .checks import shared_cache
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_request = ContextVar("replica_request", default=None)
+
+_lock = threading.Lock()
+_lag = {}
+_probing = set()
+
+
+def write_key(user_id):
+    return f"wrote:{user_id}"
+
+
+def mark_write(user_id):
+    window = getattr(settings, "READ_YOUR_WRITES_SECONDS", 5)
+    if window:
+        cache.set(write_key(user_id), True, window)
+
+
+def recently_wrote(user_id):
+    return cache.get(write_key(user_id)) is not None
+
+
+def measure_lag(alias):
+    """Seconds the replica is behind its primary (0 if not replicated)."""
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+            "THEN 0 ELSE coalesce(EXTRACT(EPOCH FROM "
+            "now() - pg_last_xact_replay_timestamp()), 0) END"
+        )
+        return float(cursor.fetchone()[0])
+
+
+def probe(alias):
+    """Measure the replica's lag now and store it for healthy()."""
+    try:
+        lag = measure_lag(alias)
+    except DatabaseError:
+        lag = None
+    with _lock:
+        _lag[alias] = (time.monotonic(), lag)
+
+
+def _probe_in_background(alias):
+    try:
+        probe(alias)
+    finally:
+        # The probe opened this thread's own connection to the replica.
+        connections[alias].close()
+        with _lock:
+            _probing.discard(alias)
+
+
+def healthy(alias):
+    interval = getattr(settings, "REPLICA_LAG_CHECK_INTERVAL", 5)
+    now = time.monotonic()
+    with _lock:
+        checked = _lag.get(alias)
+        stale = checked is None or now - checked[0] > interval
+        if stale and alias not in _probing:
+            _probing.add(alias)
+            threading.Thread(
+                target=_probe_in_background,
+                args=(alias,),
+                name=f"replica-lag-{alias}",
+                daemon=True,
+            ).start()
+    if checked is None or now - checked[0] > 3 * interval:
+        return False
+    lag = checked[1]
+    return lag is not None and lag <= getattr(settings, "REPLICA_MAX_LAG_SECONDS", 5)
+
+
+def reset():
+    with _lock:
+        _lag.clear()
+
+
+def _user_id(request):
+    # Don't resolve a lazy user here: that would itself run a query.
+    user = request.__dict__.get("user")
+    if isinstance(user, SimpleLazyObject):
+        if user._wrapped is empty:
+            return None
+        user = user._wrapped
+    if user is None or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+def _atomic_depth():
+    # Every atomic block inside the outermost one pushes a savepoint id.
+    connection = connections[DEFAULT_DB_ALIAS]
+    return connection.in_atomic_block + len(connection.savepoint_ids)
+
+
+class _RequestState:
+    def __init__(self, request, atomic_depth):
+        self.request = request
+        self.safe = request.method in SAFE_METHODS
+        self.pinned = None
+        self.atomic_depth = atomic_depth
+
+    def use_primary(self):
+        # Reads in a transaction opened during the request must see its writes.
+        if not self.safe or self.in_transaction():
+            return True
+        if self.pinned is None:
+            user_id = _user_id(self.request)
+            if user_id is None:
+                return False
+            self.pinned = recently_wrote(user_id)
+        return self.pinned
+
+    def in_transaction(self):
+        return _atomic_depth() > self.atomic_depth
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, "DATABASE_REPLICAS", [])
+        state = _request.get()
+        if (
+            not replicas
+            or state is None
+            or not shared_cache()
+            or model is Session
+            or model._meta.label == settings.AUTH_USER_MODEL
+            or state.use_primary()
+        ):
+            return DEFAULT_DB_ALIAS
+        candidates = [alias for alias in replicas if healthy(alias)]
+        return random.choice(candidates) if candidates else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Never follow an instance back to the replica it was read from.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = asyncio.iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = _RequestState(request, _atomic_depth())
+        token = _request.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request.reset(token)
+        self.finish(request, state)
+        return response
+
+    async def __acall__(self, request):
+        # Queries run through sync_to_async in threads whose connections
+        # aren't in a transaction when the request starts.
+        state = _RequestState(request, 0)
+        token = _request.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request.reset(token)
+        if not state.safe:
+            await sync_to_async(self.finish)(request, state)
+        return response
+
+    def finish(self, request, state):
+        if not state.safe:
+            # DRF stores the user it authenticated on the request.
+            user_id = _user_id(request)
+            if user_id is not None:
+                mark_write(user_id)
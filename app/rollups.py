@@ -0,0 +1,136 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from . import category_cache, partitions, versioning
+from .models import MonthlyRollup
+
+
+def period(created_at):
+    """Return the (year, month) a timestamp is counted under."""
+    local = timezone.localtime(created_at)
+    return local.year, local.month
+
+
+def apply_delta(user_id, year, month, category_id, total, count, create=True):
+    if not total and not count:
+        return
+    with transaction.atomic():
+        key = dict(user_id=user_id, year=year, month=month, category_id=category_id)
+        if create:
+            MonthlyRollup.objects.get_or_create(**key)
+        MonthlyRollup.objects.filter(**key).update(
+            total=F("total") + total, count=F("count") + count
+        )
+
+
+def apply_transactions(objs):
+    """Add freshly inserted transactions (e.g. from bulk_create) in one pass."""
+    deltas = defaultdict(lambda: [0, 0])
+    for obj in objs:
+        key = (obj.user_id, *period(obj.created_at), obj.category_id)
+        deltas[key][0] += obj.amount
+        deltas[key][1] += 1
+    for (user_id, year, month, category_id), (total, count) in deltas.items():
+        apply_delta(user_id, year, month, category_id, total, count)
+
+
+def apply_changes(removed=(), added=()):
+    """
+    Apply the net effect of removing and adding transaction rows (dicts
+    with user_id, category_id, amount and created_at) in one pass.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for rows, sign in ((removed, -1), (added, 1)):
+        for row in rows:
+            key = (row["user_id"], *period(row["created_at"]), row["category_id"])
+            deltas[key][0] += sign * row["amount"]
+            deltas[key][1] += sign
+    for (user_id, year, month, category_id), (total, count) in deltas.items():
+        apply_delta(user_id, year, month, category_id, total, count)
+
+
+def grouped(queryset):
+    """Sum ``queryset`` into rollup keys, without loading its rows."""
+    tz = timezone.get_current_timezone()
+    return (
+        queryset.order_by()
+        .annotate(
+            year=ExtractYear("created_at", tzinfo=tz),
+            month=ExtractMonth("created_at", tzinfo=tz),
+        )
+        .values("user_id", "year", "month", "category_id")
+        .annotate(total=Sum("amount"), count=Count("id"))
+    )
+
+
+def rebuild(user_ids=None):
+    """Recompute rollup rows from the Transaction table and the archive."""
+    existing = MonthlyRollup.objects.all()
+    if user_ids is not None:
+        existing = existing.filter(user_id__in=user_ids)
+
+    built = {}
+    for rows in partitions.transaction_sources():
+        if user_ids is not None:
+            rows = rows.filter(user_id__in=user_ids)
+        for row in grouped(rows):
+            key = (row["user_id"], row["year"], row["month"], row["category_id"])
+            if key in built:
+                built[key].total += row["total"]
+                built[key].count += row["count"]
+            else:
+                built[key] = MonthlyRollup(**row)
+
+    objs = list(built.values())
+    with transaction.atomic():
+        existing.delete()
+        MonthlyRollup.objects.bulk_create(objs, batch_size=1000)
+    return len(objs)
+
+
+def category_totals(user_id, version=None):
+    """
+    Return ``{category_id: {"count": ..., "total": ...}}`` for a user's
+    transactions, summed from their rollup rows rather than the
+    Transaction table. Cached for ``CATEGORY_TOTALS_CACHE_TIMEOUT`` seconds
+    under the user's data version (looked up unless given), so any write
+    invalidates it.
+    """
+    timeout = getattr(settings, "CATEGORY_TOTALS_CACHE_TIMEOUT", 0)
+    if timeout:
+        if version is None:
+            version = versioning.get(user_id)
+        key = f"category-totals:{user_id}:{version}"
+        totals = cache.get(key)
+        if totals is not None:
+            return totals
+
+    rows = (
+        MonthlyRollup.objects.filter(user_id=user_id)
+        .order_by()
+        .values("category_id")
+        .annotate(count=Sum("count"), total=Sum("total"))
+    )
+    totals = {
+        row["category_id"]: {"count": row["count"], "total": row["total"]}
+        for row in rows
+        if row["count"]
+    }
+    if timeout:
+        cache.set(key, totals, timeout)
+    return totals
+
+
+def category_breakdown(user_id, version=None):
+    """category_totals() as a list keyed by category name, for responses."""
+    totals = category_totals(user_id, version)
+    return [
+        {"category": category_cache.get_name(category_id), **values}
+        for category_id, values in sorted(totals.items())
+    ]
@@ -0,0 +1,112 @@
+"""
+Index-backed search for ``Transaction.title``.
+
+PostgreSQL uses a generated ``search_vector`` tsvector column with a GIN
+index for word/prefix matches, plus a pg_trgm GIN index on ``title`` so
+substring matches (``ILIKE '%term%'``) are served by an index too. SQLite
+uses an FTS5 table kept in sync by triggers. Both are created in
+migration 0015; other databases fall back to DRF's SearchFilter.
+"""
+import re
+from datetime import timezone
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import ExtractMonth
+from rest_framework.filters import OrderingFilter, SearchFilter
+
+WORD = re.compile(r"\w+", re.UNICODE)
+
+FTS_TABLE = "app_transaction_fts"
+
+
+def like_pattern(term):
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def words(terms):
+    return [word.lower() for term in terms for word in WORD.findall(term)]
+
+
+def postgres_search(queryset, terms):
+    table = queryset.model._meta.db_table
+    query = " & ".join(f"{word}:*" for word in words(terms))
+    substring = " AND ".join(f'"{table}"."title" ILIKE %s' for _ in terms)
+    return queryset.annotate(
+        search_rank=RawSQL(
+            f'ts_rank("{table}"."search_vector", to_tsquery(\'simple\', %s))',
+            [query],
+            output_field=FloatField(),
+        )
+    ).filter(
+        RawSQL(
+            f'("{table}"."search_vector" @@ to_tsquery(\'simple\', %s)) '
+            f"OR ({substring})",
+            [query, *(like_pattern(term) for term in terms)],
+            output_field=BooleanField(),
+        )
+    )
+
+
+def sqlite_search(queryset, terms):
+    table = queryset.model._meta.db_table
+    query = " ".join(f'"{word}"*' for word in words(terms))
+    return queryset.annotate(
+        search_rank=RawSQL(
+            f"(SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id")',
+            [query],
+            output_field=FloatField(),
+        )
+    ).filter(
+        RawSQL(
+            f'"{table}"."id" IN '
+            f"(SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)",
+            [query],
+            output_field=BooleanField(),
+        )
+    )
+
+
+BACKENDS = {"postgresql": postgres_search, "sqlite": sqlite_search}
+
+
+class TransactionSearchFilter(SearchFilter):
+    """
+    Drop-in replacement for SearchFilter on the ``search`` parameter that
+    matches word prefixes through the full-text index and annotates each
+    row with ``search_rank``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        backend = BACKENDS.get(connection.vendor)
+        if not terms or backend is None or not words(terms):
+            return super().filter_queryset(request, queryset, view)
+        return backend(queryset, terms)
+
+
+class TransactionOrderingFilter(OrderingFilter):
+    """
+    Order search results by relevance unless ``ordering`` is given.
+    ``month`` is annotated when the queryset doesn't already have it.
+    """
+
+    def get_default_ordering(self, view):
+        ordering = super().get_default_ordering(view)
+        if getattr(view, "search_ranked", False):
+            return ["-search_rank", *(ordering or [])]
+        return ordering
+
+    def filter_queryset(self, request, queryset, view):
+        view.search_ranked = "search_rank" in queryset.query.annotations
+        ordering = self.get_ordering(request, queryset, view) or []
+        if "month" not in queryset.query.annotations and any(
+            term.lstrip("-") == "month" for term in ordering
+        ):
+            queryset = queryset.annotate(
+                month=ExtractMonth("created_at", tzinfo=timezone.utc)
+            )
+        return super().filter_queryset(request, queryset, view)
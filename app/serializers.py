@@ -1,4 +1,5 @@
 from datetime import datetime
+from app import category_cache
 from app.models import Category, Transaction
 from django.contrib.auth import authenticate, get_user_model
 from rest_framework import serializers
@@ -13,6 +14,13 @@ class MonthField(serializers.Field):
         return value
 
 
+class CategoryField(serializers.CharField):
+    """Category name on the wire, category id in validated data."""
+
+    def to_representation(self, value):
+        return category_cache.get_name(value)
+
+
 class UserSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -54,34 +62,34 @@ class UserLoginSerializer(serializers.Serializer):
 
 class CategorySerializer(serializers.ModelSerializer):
 
-    transaction_count = serializers.IntegerField(read_only=True)
+    transaction_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
         fields = ["name", "transaction_count"]
 
     def get_transaction_count(self, obj):
-        return obj.transaction_count
+        # The requesting user's totals from rollups.category_totals().
+        totals = self.context.get("category_totals", {})
+        return totals.get(obj.id, {}).get("count", 0)
 
 
 class TransactionSerializer(serializers.ModelSerializer):
 
     month = serializers.SerializerMethodField(method_name="get_month")
-    category = serializers.CharField(error_messages={"blank": "Select a category type"})
+    category = CategoryField(
+        source="category_id", error_messages={"blank": "Select a category type"}
+    )
 
     def validate_category(self, value):
-        if not Category.objects.filter(name=value.lower()).exists():
+        category_id = category_cache.get_id(value.lower())
+        if category_id is None:
             raise serializers.ValidationError("Category does not exist!")
-        return value
+        return category_id
 
     def create(self, validated_data):
         user = self.context["user"]
-        category_name = validated_data.pop("category").lower()
-        category = Category.objects.get(name=category_name)
-
-        return Transaction.objects.create(
-            user=user, category=category, **validated_data
-        )
+        return Transaction.objects.create(user_id=user.id, **validated_data)
 
     def get_month(self, obj):
         return obj.created_at.month
@@ -89,3 +97,25 @@ class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
         fields = ["id", "category", "title", "amount", "created_at", "month"]
+
+
+class TransactionListSerializer(serializers.BaseSerializer):
+    """
+    Read-only serializer for list pages built from ``.values()`` rows
+    (see ``TransactionViewSet.get_queryset``). Output is identical to
+    TransactionSerializer, without building a field set for every row.
+    """
+
+    fields = ("id", "category_id", "title", "amount", "created_at")
+    amount_field = serializers.DecimalField(max_digits=7, decimal_places=2)
+    created_at_field = serializers.DateTimeField()
+
+    def to_representation(self, row):
+        return {
+            "id": row["id"],
+            "category": category_cache.get_name(row["category_id"]),
+            "title": row["title"],
+            "amount": self.amount_field.to_representation(row["amount"]),
+            "created_at": self.created_at_field.to_representation(row["created_at"]),
+            "month": row["month"],
+        }
@@ -0,0 +1,153 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import category_cache, changes, events, ledger, partitions, rollups, suggestions
+from .models import Category, Transaction
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, **kwargs):
+    category_cache.invalidate()
+
+
+@receiver(pre_save, sender=Category)
+def remember_previous_name(sender, instance, **kwargs):
+    instance._previous_name = None
+    if instance.pk is None:
+        return
+    instance._previous_name = (
+        Category.objects.filter(pk=instance.pk).values_list("name", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Category)
+def rebuild_ledgers_on_rename(sender, instance, created, raw=False, **kwargs):
+    # The ledger books by category name, so renaming a category to or from
+    # income/expense moves its owners' money.
+    previous = getattr(instance, "_previous_name", None)
+    if raw or created or previous == instance.name:
+        return
+    if not {previous, instance.name} & {ledger.INCOME, ledger.EXPENSE}:
+        return
+    user_ids = set()
+    for rows in partitions.transaction_sources():
+        user_ids.update(
+            rows.filter(category_id=instance.pk)
+            .order_by("user_id")
+            .values_list("user_id", flat=True)
+            .distinct()
+        )
+    if user_ids:
+        ledger.rebuild(user_ids)
+
+
+def _book(row, sign, create=True):
+    """Add (sign=1) or remove (sign=-1) a transaction row from the ledger."""
+    income, expense = ledger.contributions([(row["category_id"], row["amount"])])
+    ledger.apply_delta(row["user_id"], sign * income, sign * expense, create=create)
+
+
+def _roll(row, sign, create=True):
+    """Add (sign=1) or remove (sign=-1) a transaction row from the rollups."""
+    rollups.apply_delta(
+        row["user_id"],
+        *rollups.period(row["created_at"]),
+        row["category_id"],
+        sign * row["amount"],
+        sign,
+        create=create,
+    )
+
+
+def _as_row(instance):
+    return {
+        "user_id": instance.user_id,
+        "category_id": instance.category_id,
+        "amount": instance.amount,
+        "created_at": instance.created_at,
+        "title": instance.title,
+    }
+
+
+@receiver(pre_save, sender=Transaction)
+def ensure_partition(sender, instance, **kwargs):
+    partitions.ensure([instance.created_at or timezone.now()])
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_transaction(sender, instance, **kwargs):
+    # Keep the row as it is stored so post_save can reverse its old effect.
+    instance._previous_row = None
+    if instance.pk is None:
+        return
+    instance._previous_row = (
+        Transaction.objects.select_for_update()
+        .filter(pk=instance.pk)
+        .values("user_id", "category_id", "amount", "created_at", "title")
+        .first()
+    )
+
+
+@receiver(pre_save, sender=Transaction)
+def book_and_number_transaction(sender, instance, raw=False, **kwargs):
+    # Booked before the row is written, so the data version this bumps
+    # under the Balance row lock goes into the same INSERT or UPDATE as
+    # the row's change_seq (see app.changes).
+    if raw:
+        return
+    previous = instance._previous_row
+    current = _as_row(instance)
+    amounts = [(current["category_id"], current["amount"])]
+    if previous and previous["user_id"] == current["user_id"]:
+        amounts.append((previous["category_id"], -previous["amount"]))
+    elif previous:
+        _book(previous, -1, create=False)
+    ledger.apply_delta(current["user_id"], *ledger.contributions(amounts))
+    instance.change_seq = changes.last_seq(current["user_id"])
+
+
+@receiver(post_save, sender=Transaction)
+def update_summaries_on_save(
+    sender, instance, created, raw=False, update_fields=None, **kwargs
+):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_row", None)
+    current = _as_row(instance)
+    if previous:
+        _roll(previous, -1, create=False)
+    _roll(current, 1)
+    if update_fields is not None and "change_seq" not in update_fields:
+        changes.stamp(instance)
+    events.transaction_saved(instance)
+    if previous and previous["user_id"] != current["user_id"]:
+        seq = changes.tombstone(instance.pk, previous["user_id"])
+        events.transaction_deleted(instance.pk, previous["user_id"], seq)
+
+    if previous and all(
+        previous[field] == current[field]
+        for field in ("user_id", "title", "category_id")
+    ):
+        return
+    if previous:
+        _suggest(previous, -1)
+    _suggest(current, 1)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_summaries_on_delete(sender, instance, **kwargs):
+    row = _as_row(instance)
+    _book(row, -1, create=False)
+    _roll(row, -1, create=False)
+    seq = changes.tombstone(instance.pk, instance.user_id)
+    if seq is not None:
+        events.transaction_deleted(instance.pk, instance.user_id, seq)
+    _suggest(row, -1)
+
+
+def _suggest(row, delta):
+    suggestions.apply(
+        row["user_id"], row["title"], row["category_id"], delta, row["created_at"]
+    )
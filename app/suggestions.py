@@ -0,0 +1,203 @@
+"""
+Per-user title suggestions for the transaction entry form.
+
+TitleSuggestion keeps one row per (user, normalized title) with its use
+count, last use and most common category, updated from Transaction
+writes. Lookups are a prefix range scan on (user, normalized). The
+most recently used users' suggestions can also be kept in memory
+(SUGGESTION_CACHE_USERS) as a sorted prefix index.
+"""
+import bisect
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import partitions
+from .models import TitleSuggestion
+
+
+def normalize(title):
+    return " ".join((title or "").lower().split())[:255]
+
+
+def apply(user_id, title, category_id, delta, used_at=None):
+    """Add ``delta`` uses (negative to remove them) of a title."""
+    normalized = normalize(title)
+    if not normalized:
+        return
+    key = str(category_id)
+    with transaction.atomic():
+        suggestion = (
+            TitleSuggestion.objects.select_for_update()
+            .filter(user_id=user_id, normalized=normalized)
+            .first()
+        )
+        if suggestion is None:
+            if delta < 0:
+                return
+            suggestion = TitleSuggestion(
+                user_id=user_id, normalized=normalized, category_counts={}
+            )
+
+        counts = suggestion.category_counts
+        counts[key] = counts.get(key, 0) + delta
+        if counts[key] <= 0:
+            del counts[key]
+        suggestion.count = sum(counts.values())
+        if suggestion.count <= 0:
+            if suggestion.pk:
+                suggestion.delete()
+        else:
+            if delta > 0:
+                used_at = used_at or timezone.now()
+                suggestion.title = title.strip()[:255]
+                if suggestion.last_used is None or used_at > suggestion.last_used:
+                    suggestion.last_used = used_at
+            suggestion.category_id = int(max(counts, key=counts.get))
+            suggestion.save()
+    forget(user_id)
+
+
+def apply_transactions(objs):
+    """Count freshly inserted transactions (e.g. from bulk_create)."""
+    uses = {}
+    for obj in objs:
+        key = (obj.user_id, normalize(obj.title), obj.category_id)
+        title, count, used_at = uses.get(key, (obj.title, 0, obj.created_at))
+        uses[key] = (obj.title, count + 1, max(used_at, obj.created_at))
+    for (user_id, _, category_id), (title, count, used_at) in uses.items():
+        apply(user_id, title, category_id, count, used_at)
+
+
+def apply_changes(removed=(), added=()):
+    """
+    Apply the net effect of removing and adding transaction rows (dicts
+    with user_id, title, category_id and created_at), one update per title.
+    """
+    uses = {}
+    for rows, sign in ((removed, -1), (added, 1)):
+        for row in rows:
+            key = (row["user_id"], normalize(row["title"]), row["category_id"])
+            title, count, used_at = uses.get(key, (row["title"], 0, None))
+            if sign > 0:
+                title = row["title"]
+                used_at = max(used_at or row["created_at"], row["created_at"])
+            uses[key] = (title, count + sign, used_at)
+    for (user_id, _, category_id), (title, count, used_at) in uses.items():
+        if count:
+            apply(user_id, title, category_id, count, used_at)
+
+
+def rebuild(user_ids=None):
+    """
+    Recompute every suggestion row from the Transaction table and the
+    archive, whose months all come before the live ones.
+    """
+    existing = TitleSuggestion.objects.all()
+    if user_ids is not None:
+        existing = existing.filter(user_id__in=user_ids)
+
+    values = []
+    for rows in partitions.transaction_sources():
+        if user_ids is not None:
+            rows = rows.filter(user_id__in=user_ids)
+        values.append(
+            rows.order_by("created_at")
+            .values_list("user_id", "title", "category_id", "created_at")
+            .iterator()
+        )
+
+    built = {}
+    for user_id, title, category_id, created_at in itertools.chain(*values):
+        normalized = normalize(title)
+        if not normalized:
+            continue
+        suggestion = built.setdefault(
+            (user_id, normalized),
+            TitleSuggestion(user_id=user_id, normalized=normalized, category_counts={}),
+        )
+        counts = suggestion.category_counts
+        counts[str(category_id)] = counts.get(str(category_id), 0) + 1
+        suggestion.count += 1
+        suggestion.title = title.strip()[:255]
+        suggestion.last_used = created_at
+        suggestion.category_id = int(max(counts, key=counts.get))
+
+    with transaction.atomic():
+        existing.delete()
+        TitleSuggestion.objects.bulk_create(built.values(), batch_size=1000)
+    clear()
+    return len(built)
+
+
+def suggest(user_id, prefix, limit):
+    """Return up to ``limit`` suggestions whose title starts with ``prefix``."""
+    prefix = normalize(prefix)
+    index = _cached_index(user_id)
+    if index is not None:
+        return index.search(prefix, limit)
+    return list(
+        TitleSuggestion.objects.filter(user_id=user_id, normalized__startswith=prefix)
+        .order_by("-count", "-last_used")
+        .values("title", "category_id", "count", "last_used")[:limit]
+    )
+
+
+class PrefixIndex:
+    """Sorted normalized titles; a prefix maps to one contiguous slice."""
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda row: row["normalized"])
+        self.keys = [row.pop("normalized") for row in rows]
+        self.rows = rows
+        self.loaded_at = time.monotonic()
+
+    def search(self, prefix, limit):
+        start = bisect.bisect_left(self.keys, prefix)
+        end = bisect.bisect_left(self.keys, prefix + "\uffff", lo=start)
+        matches = self.rows[start:end]
+        matches.sort(key=lambda row: (row["count"], row["last_used"]), reverse=True)
+        return matches[:limit]
+
+
+_lock = threading.Lock()
+_indexes = OrderedDict()
+
+
+def _cached_index(user_id):
+    size = getattr(settings, "SUGGESTION_CACHE_USERS", 0)
+    if not size:
+        return None
+    ttl = getattr(settings, "SUGGESTION_CACHE_TTL", 60)
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is not None and time.monotonic() - index.loaded_at <= ttl:
+            _indexes.move_to_end(user_id)
+            return index
+
+    index = PrefixIndex(
+        TitleSuggestion.objects.filter(user_id=user_id).values(
+            "normalized", "title", "category_id", "count", "last_used"
+        )
+    )
+    with _lock:
+        _indexes[user_id] = index
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > size:
+            _indexes.popitem(last=False)
+    return index
+
+
+def forget(user_id):
+    with _lock:
+        _indexes.pop(user_id, None)
+
+
+def clear():
+    with _lock:
+        _indexes.clear()
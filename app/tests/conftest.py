@@ -1,7 +1,42 @@
 import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from model_bakery import baker
 from rest_framework.test import APIClient
 
+from app import category_cache, suggestions
+
 
 @pytest.fixture
 def api_client():
     return APIClient()
+
+
+@pytest.fixture
+def authenticated_user(api_client):
+    user = baker.make(get_user_model())
+    api_client.force_authenticate(user=user)
+    return user
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    # Stands in for a cache every worker shares (see app.checks).
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(tmp_path / "cache"),
+        }
+    }
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    # These caches live for the whole process but test transactions roll back.
+    category_cache.invalidate()
+    suggestions.clear()
+    cache.clear()
+    yield
+    category_cache.invalidate()
+    suggestions.clear()
+    cache.clear()
@@ -0,0 +1,136 @@
+import pytest
+from django.contrib.admin.models import CHANGE, DELETION, LogEntry
+from django.contrib.auth import get_user_model
+from django.core import signing
+from model_bakery import baker
+
+from app import admin_changelist
+from app.authentication import get_generation, issue_token, user_from_token
+from app.admin import TransactionAdmin
+from app.admin_changelist import EstimatedCountPaginator
+from app.models import Balance, Category, Transaction, TransactionTombstone
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestTransactionAdmin:
+    endpoint = "/admin/app/transaction/"
+
+    @pytest.fixture
+    def admin_client(self, client):
+        client.force_login(baker.make(User, is_staff=True, is_superuser=True))
+        return client
+
+    @pytest.fixture
+    def user(self):
+        user = baker.make(User)
+        expense = baker.make(Category, name="expense")
+        baker.make(Category, name="income")
+        for title in ["Coffee", "Rent", "Coffee beans"]:
+            baker.make(Transaction, user=user, category=expense, title=title, amount=5)
+        return user
+
+    def titles(self, res):
+        return [obj.title for obj in res.context["cl"].result_list]
+
+    def test_changelist_pages_by_keyset(self, user, admin_client, monkeypatch):
+        monkeypatch.setattr(TransactionAdmin, "list_per_page", 2)
+
+        res = admin_client.get(self.endpoint)
+
+        cl = res.context["cl"]
+        assert self.titles(res) == ["Coffee beans", "Rent"]
+        assert cl.result_count == 3
+        assert cl.next_cursor
+
+        res = admin_client.get(self.endpoint + cl.next_url())
+        assert self.titles(res) == ["Coffee"]
+        assert res.context["cl"].next_cursor is None
+
+    def test_search_uses_the_title_index(self, user, admin_client):
+        res = admin_client.get(self.endpoint, {"q": "coff"})
+
+        assert sorted(self.titles(res)) == ["Coffee", "Coffee beans"]
+
+    def test_bulk_actions_keep_the_ledger_in_sync(self, user, admin_client):
+        coffee = Transaction.objects.filter(title__startswith="Coffee")
+        selected = [str(pk) for pk in coffee.values_list("pk", flat=True)]
+
+        admin_client.post(
+            self.endpoint,
+            {"action": "mark_as_income", "_selected_action": selected},
+        )
+        balance = Balance.objects.get(user=user)
+        assert (balance.income, balance.expense) == (10, 5)
+
+        res = admin_client.post(
+            self.endpoint,
+            {"action": "delete_without_loading", "_selected_action": selected},
+        )
+        assert res.status_code == 200
+        assert res.context["count"] == 2
+        assert Transaction.objects.count() == 3
+
+        admin_client.post(
+            self.endpoint,
+            {
+                "action": "delete_without_loading",
+                "_selected_action": selected,
+                "post": "yes",
+            },
+        )
+        balance.refresh_from_db()
+        assert (balance.income, balance.expense) == (0, 5)
+        assert list(Transaction.objects.values_list("title", flat=True)) == ["Rent"]
+        assert sorted(
+            TransactionTombstone.objects.values_list("transaction_id", flat=True)
+        ) == sorted(int(pk) for pk in selected)
+        assert [
+            (entry.action_flag, entry.object_repr)
+            for entry in LogEntry.objects.order_by("pk")
+        ] == [(CHANGE, "2 transactions"), (DELETION, "2 transactions")]
+
+
+@pytest.mark.django_db
+def test_large_estimates_replace_the_exact_count(monkeypatch, settings):
+    settings.ADMIN_ESTIMATED_COUNT_THRESHOLD = 100
+    baker.make(Transaction, _quantity=2)
+    queryset = Transaction.objects.order_by("pk")
+
+    monkeypatch.setattr(admin_changelist, "estimate_count", lambda qs: 50)
+    assert EstimatedCountPaginator(queryset, 10).count == 2
+
+    monkeypatch.setattr(admin_changelist, "estimate_count", lambda qs: 5000)
+    paginator = EstimatedCountPaginator(queryset, 10)
+    assert paginator.count == 5000
+    assert paginator.estimated
+
+
+@pytest.mark.django_db
+def test_user_admin_searches_by_prefix(client):
+    client.force_login(baker.make(User, is_staff=True, is_superuser=True))
+    baker.make(User, email="Alice@example.com", username="alice")
+    baker.make(User, email="bob@example.com", username="bob")
+
+    res = client.get("/admin/app/user/", {"q": "ali"})
+
+    assert [user.email for user in res.context["cl"].result_list] == [
+        "Alice@example.com"
+    ]
+
+
+@pytest.mark.django_db
+def test_deactivated_users_lose_their_tokens_at_once(client):
+    client.force_login(baker.make(User, is_staff=True, is_superuser=True))
+    user = baker.make(User)
+    token = issue_token(user)
+    get_generation(user.pk)
+
+    client.post(
+        "/admin/app/user/",
+        {"action": "deactivate", "_selected_action": [str(user.pk)]},
+    )
+
+    with pytest.raises(signing.BadSignature):
+        user_from_token(token)
@@ -0,0 +1,66 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app.models import Category, Transaction
+
+User = get_user_model()
+
+
+# The async views query from worker threads with their own connections, so
+# the data has to be committed rather than held in the test transaction.
+@pytest.mark.django_db(transaction=True)
+class TestAsyncViews:
+    def test_if_anonymous_list_returns_401(self):
+        res = Client().get("/v1/async/transaction/")
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+        assert res["WWW-Authenticate"] == "Bearer"
+
+    def test_async_list_matches_sync_list(self):
+        user = baker.make(User, email="async@example.com")
+        category = baker.make(Category, name="income")
+        for amount in range(1, 13):
+            title = "Monthly salary" if amount % 3 else "Bonus"
+            baker.make(
+                Transaction, user=user, category=category, title=title, amount=amount
+            )
+
+        client = Client()
+        client.force_login(user)
+        api_client = APIClient()
+        api_client.force_authenticate(user=user)
+
+        for params in (
+            {},
+            {"page": 2},
+            {"category": category.id},
+            {"search": "salary"},
+            {"ordering": "-amount"},
+            {"search": "bon", "ordering": "amount"},
+        ):
+            res = client.get("/v1/async/transaction/", params)
+            expected = api_client.get("/v1/transaction/", params)
+
+            assert res.status_code == status.HTTP_200_OK
+            assert res.json()["count"] == expected.json()["count"]
+            assert res.json()["results"] == expected.json()["results"]
+
+    def test_async_detail_and_balance(self):
+        user = baker.make(User, email="async@example.com")
+        category = baker.make(Category, name="expense")
+        obj = baker.make(Transaction, user=user, category=category, amount=7)
+        other = baker.make(Transaction, category=category, amount=1)
+
+        client = Client()
+        client.force_login(user)
+
+        res = client.get(f"/v1/async/transaction/{obj.id}/")
+        assert res.json()["category"] == "expense"
+        res = client.get(f"/v1/async/transaction/{other.id}/")
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+        res = client.get("/v1/async/balance/")
+        assert res.json()["balance"] == -7.0
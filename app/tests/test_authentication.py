@@ -0,0 +1,106 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app.authentication import issue_token, user_from_token
+
+User = get_user_model()
+
+
+@pytest.fixture
+def token_client(shared_cache):
+    cache.clear()
+    User.objects.create_user(
+        username="testuser", email="test@example.com", password="testpassword"
+    )
+    client = APIClient()
+    res = client.post(
+        "/v1/login/", {"email": "test@example.com", "password": "testpassword"}
+    )
+    token_client = APIClient()
+    token_client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['token']}")
+    return token_client
+
+
+@pytest.mark.django_db
+class TestSignedToken:
+    endpoint = "/v1/transaction/"
+
+    def test_if_token_is_valid_request_needs_no_user_query(self, token_client):
+        token_client.get(self.endpoint)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = token_client.get(self.endpoint)
+
+        assert res.status_code == status.HTTP_200_OK
+        tables = " ".join(query["sql"] for query in queries)
+        assert "django_session" not in tables
+        assert "app_user" not in tables
+
+    def test_if_token_is_tampered_returns_401(self, token_client):
+        token_client.credentials(HTTP_AUTHORIZATION="Bearer not-a-token")
+
+        res = token_client.get(self.endpoint)
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_if_user_logs_out_token_is_revoked(self, token_client):
+        res = token_client.post("/v1/logout/")
+        assert res.status_code == status.HTTP_200_OK
+
+        res = token_client.get(self.endpoint)
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.parametrize(
+        "change",
+        [
+            lambda user: user.set_password("another-password"),
+            lambda user: setattr(user, "is_staff", True),
+            lambda user: setattr(user, "is_active", False),
+        ],
+    )
+    def test_if_credentials_change_token_is_revoked(
+        self, token_client, change, django_capture_on_commit_callbacks
+    ):
+        token_client.get(self.endpoint)
+        user = User.objects.get(email="test@example.com")
+        change(user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.save()
+
+        res = token_client.get(self.endpoint)
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_without_a_shared_cache_generations_are_not_cached(self, settings):
+        settings.CACHES = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        }
+        user = User.objects.create_user(
+            username="local", email="local@example.com", password="secret"
+        )
+        token = issue_token(user)
+        user_from_token(token)
+
+        # Revoked by another worker, which can't clear this one's cache.
+        User.objects.filter(pk=user.pk).update(
+            token_generation=F("token_generation") + 1
+        )
+
+        with pytest.raises(signing.BadSignature):
+            user_from_token(token)
+
+    def test_if_profile_changes_token_stays_valid(self, token_client):
+        user = User.objects.get(email="test@example.com")
+        user.first_name = "Test"
+        user.save()
+
+        res = token_client.get(self.endpoint)
+        assert res.status_code == status.HTTP_200_OK
@@ -0,0 +1,169 @@
+from datetime import datetime, timezone
+
+import pytest
+from django.contrib.auth import get_user_model
+from model_bakery import baker
+from rest_framework import status
+
+from app import changes, ledger, rollups, suggestions
+from app.models import (
+    Balance,
+    Category,
+    MonthlyRollup,
+    TitleSuggestion,
+    Transaction,
+    TransactionTombstone,
+)
+
+User = get_user_model()
+
+
+def summaries(user):
+    balance = Balance.objects.filter(user=user).values_list(
+        "income", "expense", "balance"
+    )
+    months = MonthlyRollup.objects.filter(user=user, count__gt=0).values_list(
+        "year", "month", "category_id", "total", "count"
+    )
+    titles = TitleSuggestion.objects.filter(user=user).values_list(
+        "normalized", "category_id", "count"
+    )
+    return list(balance), sorted(months), sorted(titles)
+
+
+def assert_consistent(user):
+    """The incremental updates left what a full rebuild would produce."""
+    before = summaries(user)
+    ledger.rebuild([user.id])
+    rollups.rebuild([user.id])
+    suggestions.rebuild([user.id])
+    assert summaries(user) == before
+
+
+@pytest.mark.django_db
+class TestTransactionBatch:
+    endpoint = "/v1/transaction/batch/"
+
+    @pytest.fixture(autouse=True)
+    def categories(self):
+        baker.make(Category, name="income")
+        baker.make(Category, name="expense")
+
+    def make(self, user, title, amount, category="expense", created_at=None):
+        obj = baker.make(
+            Transaction,
+            user=user,
+            category=Category.objects.get(name=category),
+            title=title,
+            amount=amount,
+        )
+        if created_at:
+            Transaction.objects.filter(pk=obj.pk).update(created_at=created_at)
+        return obj
+
+    def test_row_operations_are_applied_together(self, authenticated_user, api_client):
+        coffee = self.make(authenticated_user, "Coffee", 3)
+        rent = self.make(authenticated_user, "Rent", 500)
+        operations = [
+            {
+                "op": "create",
+                "data": {"title": "Salary", "amount": 900, "category": "income"},
+            },
+            {"op": "update", "id": coffee.pk, "data": {"title": "Latte", "amount": 4}},
+            {"op": "delete", "id": rent.pk},
+        ]
+
+        res = api_client.post(self.endpoint, operations, format="json")
+
+        assert res.status_code == status.HTTP_200_OK
+        created, updated, deleted = res.data["results"]
+        assert created["transaction"]["title"] == "Salary"
+        assert Transaction.objects.get(pk=created["id"]).title == "Salary"
+        assert updated["transaction"]["amount"] == "4.00"
+        assert deleted == {"op": "delete", "id": rent.pk}
+        assert sorted(Transaction.objects.values_list("title", flat=True)) == [
+            "Latte",
+            "Salary",
+        ]
+        assert Balance.objects.get(user=authenticated_user).balance == 896
+        assert_consistent(authenticated_user)
+
+        rows, deleted_ids, _, _ = changes.since(authenticated_user.id, 0, 10)
+        assert sorted(row["title"] for row in rows) == ["Latte", "Salary"]
+        assert deleted_ids == [rent.pk]
+
+    def test_filters_change_rows_without_loading_them(
+        self, authenticated_user, api_client
+    ):
+        march = datetime(2024, 3, 10, tzinfo=timezone.utc)
+        april = datetime(2024, 4, 10, tzinfo=timezone.utc)
+        self.make(authenticated_user, "Coffee", 3, created_at=march)
+        self.make(authenticated_user, "Coffee", 4, created_at=march)
+        self.make(authenticated_user, "Refund", 20, created_at=march)
+        self.make(authenticated_user, "Rent", 500, created_at=april)
+        rollups.rebuild([authenticated_user.id])
+        suggestions.rebuild([authenticated_user.id])
+        expense = Category.objects.get(name="expense")
+        operations = [
+            {
+                "op": "update",
+                "filter": {"year": 2024, "month": 3, "category": expense.pk},
+                "data": {"category": "income"},
+            },
+            {"op": "delete", "filter": {"created_before": "2024-03-10T00:00:01Z"}},
+        ]
+
+        res = api_client.post(self.endpoint, operations, format="json")
+
+        assert res.data["results"] == [
+            {"op": "update", "count": 3},
+            {"op": "delete", "count": 3},
+        ]
+        assert list(Transaction.objects.values_list("title", flat=True)) == ["Rent"]
+        assert Balance.objects.get(user=authenticated_user).balance == -500
+        assert_consistent(authenticated_user)
+
+        seqs = sorted(TransactionTombstone.objects.values_list("change_seq", flat=True))
+        assert seqs == list(range(seqs[0], seqs[0] + 3))
+
+    def test_filter_updates_number_each_row(self, authenticated_user, api_client):
+        for title in ["Coffee", "Tea", "Rent"]:
+            self.make(authenticated_user, title, 3)
+        seq = changes.last_seq(authenticated_user.id)
+        operations = [
+            {
+                "op": "update",
+                "filter": {"created_after": "2000-01-01T00:00:00Z"},
+                "data": {"category": "income"},
+            }
+        ]
+
+        api_client.post(self.endpoint, operations, format="json")
+
+        rows, _, _, _ = changes.since(authenticated_user.id, seq, 10)
+        assert [row["title"] for row in rows] == ["Coffee", "Tea", "Rent"]
+        assert [row["change_seq"] for row in rows] == [seq + 1, seq + 2, seq + 3]
+
+    def test_invalid_operations_write_nothing(self, authenticated_user, api_client):
+        coffee = self.make(authenticated_user, "Coffee", 3)
+        other = self.make(baker.make(User), "Other", 1)
+        operations = [
+            {"op": "delete", "id": coffee.pk},
+            {"op": "update", "id": coffee.pk, "data": {"amount": 1}},
+            {"op": "create", "data": {"title": "x", "amount": 1, "category": "nope"}},
+            {"op": "delete", "filter": {}},
+        ]
+
+        res = api_client.post(self.endpoint, operations, format="json")
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert [error["index"] for error in res.data["errors"]] == [1, 2, 3]
+
+        operations = [
+            {"op": "delete", "id": coffee.pk},
+            {"op": "delete", "id": other.pk},
+        ]
+        res = api_client.post(self.endpoint, operations, format="json")
+
+        assert res.data["errors"] == [{"index": 1, "errors": {"id": "Not found."}}]
+        assert Transaction.objects.count() == 2
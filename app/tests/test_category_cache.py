@@ -0,0 +1,51 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+
+from app import category_cache
+from app.models import Category
+from app.serializers import TransactionSerializer
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestCategoryCache:
+    def test_lookups_are_served_from_memory(self):
+        category = baker.make(Category, name="income")
+        assert category_cache.get_id("income") == category.id
+
+        with CaptureQueriesContext(connection) as queries:
+            assert category_cache.get_id("income") == category.id
+            assert category_cache.get_name(category.id) == "income"
+        assert len(queries) == 0
+
+    def test_rename_and_delete_invalidate(self):
+        category = baker.make(Category, name="income")
+        assert category_cache.get_id("income") == category.id
+
+        category.name = "salary"
+        category.save()
+        assert category_cache.get_name(category.id) == "salary"
+
+        category.delete()
+        assert category_cache.get_id("salary") is None
+
+    def test_serializer_create_resolves_category_without_queries(self):
+        user = baker.make(User)
+        category = baker.make(Category, name="expense")
+        category_cache.get_id("expense")
+
+        serializer = TransactionSerializer(
+            data={"category": "Expense", "title": "a", "amount": 5},
+            context={"user": user},
+        )
+        with CaptureQueriesContext(connection) as queries:
+            assert serializer.is_valid(), serializer.errors
+        assert len(queries) == 0
+
+        transaction = serializer.save()
+        assert transaction.category_id == category.id
+        assert serializer.data["category"] == "expense"
@@ -0,0 +1,105 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+
+from app import changes
+from app.models import Category, Transaction
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestChangeFeed:
+    endpoint = "/v1/transaction/changes/"
+
+    @pytest.fixture(autouse=True)
+    def category(self):
+        return baker.make(Category, name="expense")
+
+    def sync(self, api_client, since, limit=100):
+        """Follow ``next`` until caught up; return the ids seen and the last seq."""
+        seen, deleted = [], []
+        while True:
+            res = api_client.get(self.endpoint, {"since": since, "limit": limit})
+            assert res.status_code == 200
+            seen += [row["title"] for row in res.data["transactions"]]
+            deleted += res.data["deleted"]
+            since = res.data["next"]
+            if not res.data["has_more"]:
+                return seen, deleted, since
+
+    def test_only_changes_after_since_are_returned(
+        self, authenticated_user, api_client
+    ):
+        for title in ["Rent", "Coffee", "Tea"]:
+            api_client.post(
+                "/v1/transaction/",
+                {"title": title, "amount": 3, "category": "expense"},
+            )
+        seen, deleted, since = self.sync(api_client, 0, limit=2)
+        assert seen == ["Rent", "Coffee", "Tea"]
+
+        coffee = Transaction.objects.get(title="Coffee")
+        tea = Transaction.objects.get(title="Tea")
+        api_client.patch(f"/v1/transaction/{coffee.pk}/", {"title": "Latte"})
+        api_client.delete(f"/v1/transaction/{tea.pk}/")
+
+        seen, deleted, last = self.sync(api_client, since, limit=1)
+        assert seen == ["Latte"]
+        assert deleted == [tea.pk]
+        assert self.sync(api_client, last) == ([], [], last)
+
+    def test_saves_are_numbered_in_the_same_statement(
+        self, authenticated_user, category
+    ):
+        obj = baker.make(Transaction, user=authenticated_user, category=category)
+        with CaptureQueriesContext(connection) as queries:
+            obj.title = "Renamed"
+            obj.save()
+        obj.refresh_from_db()
+
+        assert obj.change_seq == changes.last_seq(authenticated_user.id)
+        updates = [
+            query for query in queries if 'UPDATE "app_transaction"' in query["sql"]
+        ]
+        assert len(updates) == 1
+
+        obj.title = "Partial"
+        obj.save(update_fields=["title"])
+        obj.refresh_from_db()
+        assert obj.change_seq == changes.last_seq(authenticated_user.id)
+
+    def test_bulk_rows_can_be_resumed_one_at_a_time(
+        self, authenticated_user, api_client
+    ):
+        rows = [
+            {"title": f"t{i}", "amount": 1, "category": "expense"} for i in range(3)
+        ]
+        api_client.post("/v1/transaction/bulk/", rows, format="json")
+
+        seen, _, _ = self.sync(api_client, 0, limit=1)
+
+        assert sorted(seen) == ["t0", "t1", "t2"]
+
+    def test_moving_a_transaction_deletes_it_for_the_old_owner(
+        self, authenticated_user
+    ):
+        obj = baker.make(
+            Transaction, user=authenticated_user, category=Category.objects.get()
+        )
+        other = baker.make(User)
+
+        obj.user = other
+        obj.save()
+
+        _, deleted, _, _ = changes.since(authenticated_user.id, 0, 10)
+        rows, _, _, _ = changes.since(other.id, 0, 10)
+        assert deleted == [obj.pk]
+        assert [row["id"] for row in rows] == [obj.pk]
+
+    def test_invalid_since_is_rejected(self, authenticated_user, api_client):
+        res = api_client.get(self.endpoint, {"since": "-1"})
+
+        assert res.status_code == 400
@@ -1,9 +1,16 @@
+import json
+from datetime import datetime, timezone
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework import status
 from app.models import Category, Transaction
+from app.serializers import TransactionSerializer
 import pytest
 from model_bakery import baker
 from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
 
 
 
@@ -105,6 +112,265 @@ class TestTransaction:
         res = api_client.delete(f"{self.endpoint}{data.data['id']}/")
         assert res.status_code == status.HTTP_204_NO_CONTENT
 
+    def test_if_authenticate_user_list_returns_balance(self, authenticate, api_client):
+        user = authenticate()
+
+        income = baker.make(Category, name="income")
+        expense = baker.make(Category, name="expense")
+        baker.make(Transaction, user=user, category=income, amount=100)
+        baker.make(Transaction, user=user, category=expense, amount=30)
+
+        res = api_client.get(self.endpoint)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data["results"]["income"] == 100
+        assert res.data["results"]["expense"] == 30
+        assert res.data["results"]["balance"] == 70
+        assert len(res.data["results"]["transactions"]) == 2
+
+    def test_if_cursor_pagination_walks_all_pages(self, authenticate, api_client):
+        user = authenticate()
+
+        category = baker.make(Category, name="income")
+        transactions = baker.make(
+            Transaction, user=user, category=category, amount=1, _quantity=15
+        )
+        Transaction.objects.update(created_at=transactions[0].created_at)
+
+        res = api_client.get(self.endpoint, {"pagination": "cursor"})
+        seen = [row["id"] for row in res.data["results"]["transactions"]]
+        assert res.data["results"]["income"] == 15
+        assert "count" not in res.data
+
+        res = api_client.get(res.data["next"])
+        seen += [row["id"] for row in res.data["results"]["transactions"]]
+
+        assert res.data["next"] is None
+        assert seen == sorted((t.id for t in transactions), reverse=True)
+
+    def test_if_year_month_filter_returns_only_that_month(
+        self, authenticate, api_client
+    ):
+        user = authenticate()
+
+        category = baker.make(Category, name="income")
+        january, february, last_year = baker.make(
+            Transaction, user=user, category=category, amount=1, _quantity=3
+        )
+        for obj, created_at in [
+            (january, "2024-01-31T23:59:59Z"),
+            (february, "2024-02-01T00:00:00Z"),
+            (last_year, "2023-01-15T12:00:00Z"),
+        ]:
+            Transaction.objects.filter(pk=obj.pk).update(created_at=created_at)
+
+        res = api_client.get(self.endpoint, {"year": 2024, "month": 1})
+        ids = [row["id"] for row in res.data["results"]["transactions"]]
+        assert ids == [january.id]
+
+        res = api_client.get(
+            self.endpoint,
+            {"created_after": "2023-06-01", "created_before": "2024-02-01"},
+        )
+        ids = [row["id"] for row in res.data["results"]["transactions"]]
+        assert ids == [january.id]
+
+        res = api_client.get(self.endpoint, {"month": 13})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_etag_matches_returns_304_until_data_changes(
+        self, authenticate, api_client
+    ):
+        user = authenticate()
+
+        category = baker.make(Category, name="income")
+        baker.make(Transaction, user=user, category=category, amount=1)
+
+        res = api_client.get(self.endpoint)
+        etag = res["ETag"]
+        assert "Last-Modified" not in res
+
+        res = api_client.get(self.endpoint, HTTP_IF_NONE_MATCH=etag)
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+        res = api_client.get(
+            self.endpoint, HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT"
+        )
+        assert res.status_code == status.HTTP_200_OK
+
+        baker.make(Transaction, user=user, category=category, amount=1)
+        res = api_client.get(self.endpoint, HTTP_IF_NONE_MATCH=etag)
+        assert res.status_code == status.HTTP_200_OK
+        assert res["ETag"] != etag
+
+    def test_if_response_cache_enabled_skips_transaction_queries(
+        self, authenticate, api_client, settings, django_assert_max_num_queries
+    ):
+        settings.RESPONSE_CACHE_TIMEOUT = 60
+        cache.clear()
+        user = authenticate()
+
+        category = baker.make(Category, name="income")
+        baker.make(Transaction, user=user, category=category, amount=1)
+        first = api_client.get(self.endpoint, {"page": 1})
+
+        with django_assert_max_num_queries(1):
+            second = api_client.get(self.endpoint, {"page": 1})
+        assert second.data == first.data
+
+    def test_if_window_pagination_returns_filtered_totals(
+        self, authenticate, api_client, django_assert_num_queries
+    ):
+        user = authenticate()
+
+        income = baker.make(Category, name="income")
+        expense = baker.make(Category, name="expense")
+        baker.make(Transaction, user=user, category=income, amount=5, _quantity=12)
+        baker.make(Transaction, user=user, category=expense, amount=2, _quantity=3)
+        params = {"pagination": "window", "category": expense.id}
+        api_client.get(self.endpoint, params)
+
+        # Data version, category filter lookup, ledger row and a single query
+        # for the page, the count and the filtered totals.
+        with django_assert_num_queries(4):
+            res = api_client.get(self.endpoint, params)
+
+        assert res.data["count"] == 3
+        assert res.data["next"] is None
+        assert res.data["results"]["filtered"]["expense"] == 6
+        assert res.data["results"]["filtered"]["income"] == 0
+        assert res.data["results"]["balance"] == 54
+
+        res = api_client.get(self.endpoint, {"pagination": "window", "page": 2})
+        assert res.data["count"] == 15
+        assert len(res.data["results"]["transactions"]) == 5
+
+        res = api_client.get(self.endpoint, {"pagination": "window", "page": 3})
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_list_output_matches_full_serializer(self, authenticate, api_client):
+        user = authenticate()
+
+        category = baker.make(Category, name="expense")
+        baker.make(Transaction, user=user, category=category, amount=1, _quantity=3)
+        baker.make(Transaction, user=user, category=category, amount="12.5")
+
+        res = api_client.get(self.endpoint)
+
+        expected = TransactionSerializer(
+            Transaction.objects.filter(user=user).order_by("-created_at", "-id"),
+            many=True,
+        ).data
+        assert JSONRenderer().render(
+            res.data["results"]["transactions"]
+        ) == JSONRenderer().render(expected)
+
+
+@pytest.mark.django_db
+class TestTransactionBulk:
+    endpoint = "/v1/transaction/bulk/"
+
+    def test_if_bulk_json_creates_valid_rows_and_reports_errors(
+        self, authenticate, api_client
+    ):
+        user = authenticate()
+
+        baker.make(Category, name="income")
+        baker.make(Category, name="expense")
+        rows = [
+            {"category": "income", "title": "salary", "amount": 100},
+            {"category": "missing", "title": "x", "amount": 1},
+            {"category": "expense", "title": "rent", "amount": 40},
+        ]
+        res = api_client.post(self.endpoint, rows, format="json")
+
+        assert res.status_code == status.HTTP_201_CREATED
+        assert res.data["created"] == 2
+        assert [error["row"] for error in res.data["errors"]] == [1]
+        assert Transaction.objects.filter(user=user).count() == 2
+        assert user.balance.balance == 60
+
+    def test_if_bulk_atomic_with_errors_returns_400(self, authenticate, api_client):
+        authenticate()
+
+        baker.make(Category, name="income")
+        rows = [
+            {"category": "income", "title": "salary", "amount": 100},
+            {"category": "income", "title": "", "amount": 1},
+        ]
+        res = api_client.post(f"{self.endpoint}?atomic=true", rows, format="json")
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Transaction.objects.exists()
+
+    def test_if_bulk_csv_upload_returns_201(self, authenticate, api_client):
+        authenticate()
+
+        baker.make(Category, name="expense")
+        upload = SimpleUploadedFile(
+            "export.csv",
+            b"category,title,amount\nexpense,coffee,3.50\nexpense,lunch,12\n",
+            content_type="text/csv",
+        )
+        res = api_client.post(self.endpoint, {"file": upload}, format="multipart")
+
+        assert res.status_code == status.HTTP_201_CREATED
+        assert res.data["created"] == 2
+
+
+@pytest.mark.django_db
+class TestTransactionExport:
+    endpoint = "/v1/transaction/export/"
+
+    def test_if_export_csv_streams_filtered_rows(self, authenticate, api_client):
+        user = authenticate()
+
+        category = baker.make(Category, name="income")
+        baker.make(Transaction, user=user, category=category, title="salary", amount=10)
+        baker.make(Transaction, user=user, category=category, title="bonus", amount=5)
+        baker.make(Transaction, category=category, title="salary", amount=1)
+
+        res = api_client.get(self.endpoint, {"search": "salary"})
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.streaming
+        lines = b"".join(res.streaming_content).decode().splitlines()
+        assert lines[0] == "id,category,title,amount,created_at,month"
+        assert len(lines) == 2
+        assert ",income,salary,10.00," in lines[1]
+
+    def test_if_export_ndjson_returns_one_object_per_line(
+        self, authenticate, api_client
+    ):
+        user = authenticate()
+
+        category = baker.make(Category, name="expense")
+        baker.make(Transaction, user=user, category=category, amount=1, _quantity=3)
+
+        res = api_client.get(self.endpoint, {"output": "ndjson"})
+
+        assert res["Content-Type"] == "application/x-ndjson"
+        lines = b"".join(res.streaming_content).decode().splitlines()
+        assert [json.loads(line)["category"] for line in lines] == ["expense"] * 3
+
+        listed = api_client.get("/v1/transaction/").json()["results"]["transactions"]
+        assert [json.loads(line) for line in lines] == listed
+
+    def test_if_export_is_ordered_by_month_returns_200(self, authenticate, api_client):
+        user = authenticate()
+
+        category = baker.make(Category, name="expense")
+        for month in [3, 1, 2]:
+            obj = baker.make(Transaction, user=user, category=category, amount=1)
+            Transaction.objects.filter(pk=obj.pk).update(
+                created_at=datetime(2024, month, 10, tzinfo=timezone.utc)
+            )
+
+        res = api_client.get(self.endpoint, {"output": "ndjson", "ordering": "month"})
+
+        assert res.status_code == status.HTTP_200_OK
+        lines = b"".join(res.streaming_content).decode().splitlines()
+        assert [json.loads(line)["month"] for line in lines] == [1, 2, 3]
+
 
 @pytest.mark.django_db
 class TestAuth:
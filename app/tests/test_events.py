@@ -0,0 +1,209 @@
+import asyncio
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+from model_bakery import baker
+
+from app import events
+from app.async_views import run_in_thread
+from app.authentication import issue_token
+from app.models import Category, Transaction
+from app.push import PATH, EventStreamApp
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def broker():
+    events.reset()
+    yield
+    events.reset()
+
+
+async def django_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 204, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+class Connection:
+    """Drives the ASGI app the way a server would for one client."""
+
+    def __init__(self, scope):
+        self.sent = asyncio.Queue()
+        self.closed = asyncio.Event()
+        self.task = asyncio.ensure_future(
+            EventStreamApp(django_app)(scope, self.receive, self.sent.put)
+        )
+
+    async def receive(self):
+        await self.closed.wait()
+        return {"type": "http.disconnect"}
+
+    async def next(self):
+        return await asyncio.wait_for(self.sent.get(), 5)
+
+    async def close(self):
+        self.closed.set()
+        await asyncio.wait_for(self.task, 5)
+
+
+def http_scope(headers=()):
+    return {"type": "http", "path": PATH, "method": "GET", "headers": list(headers)}
+
+
+def data(message):
+    body = message["body"].decode()
+    assert body.startswith("data: ") and body.endswith("\n\n")
+    return json.loads(body[len("data: ") :])
+
+
+# The stream reads the database from worker threads, so the data has to be
+# committed rather than held in the test transaction.
+@pytest.mark.django_db(transaction=True)
+class TestServerSentEvents:
+    def test_writes_are_pushed_with_the_new_balance(self):
+        user = baker.make(User)
+        category = baker.make(Category, name="income")
+        token = issue_token(user)
+
+        def write():
+            obj = Transaction.objects.create(
+                user=user, category=category, title="Salary", amount=100
+            )
+            pk = obj.pk
+            obj.delete()
+            return pk
+
+        async def stream():
+            connection = Connection(
+                http_scope([(b"authorization", f"Bearer {token}".encode())])
+            )
+            start = await connection.next()
+            received = [data(await connection.next())]
+            pk = await run_in_thread(write)
+            received += [data(await connection.next()), data(await connection.next())]
+            await connection.close()
+            return start, received, pk
+
+        start, (first, saved, deleted), pk = asyncio.run(stream())
+
+        assert start["status"] == 200
+        assert (b"content-type", b"text/event-stream") in start["headers"]
+        assert first == {
+            "type": "balance",
+            "balance": {"income": 0.0, "expense": 0.0, "balance": 0.0},
+        }
+        assert saved["type"] == "upsert"
+        assert saved["transaction"]["title"] == "Salary"
+        assert saved["balance"]["balance"] == 100.0
+        assert deleted == {
+            "type": "delete",
+            "seq": saved["seq"] + 1,
+            "id": pk,
+            "balance": {"income": 0.0, "expense": 0.0, "balance": 0.0},
+        }
+
+    def test_anonymous_requests_are_refused(self):
+        async def stream():
+            connection = Connection(http_scope())
+            start = await connection.next()
+            await connection.next()
+            await asyncio.wait_for(connection.task, 5)
+            return start
+
+        start = asyncio.run(stream())
+        assert start["status"] == 401
+        assert (b"www-authenticate", b"Bearer") in start["headers"]
+
+
+class WebSocket:
+    """Drives the ASGI app through one WebSocket handshake."""
+
+    def __init__(self, headers):
+        self.sent = asyncio.Queue()
+        self.received = asyncio.Queue()
+        self.received.put_nowait({"type": "websocket.connect"})
+        scope = {"type": "websocket", "path": PATH, "headers": list(headers)}
+        self.task = asyncio.ensure_future(
+            EventStreamApp(django_app)(scope, self.received.get, self.sent.put)
+        )
+
+    async def next(self):
+        return await asyncio.wait_for(self.sent.get(), 5)
+
+    async def close(self):
+        self.received.put_nowait({"type": "websocket.disconnect"})
+        await asyncio.wait_for(self.task, 5)
+
+
+def session_cookie(user):
+    client = Client()
+    client.force_login(user)
+    cookies = "; ".join(f"{c.key}={c.value}" for c in client.cookies.values())
+    return (b"cookie", cookies.encode())
+
+
+@pytest.mark.django_db(transaction=True)
+class TestWebSocket:
+    def handshake(self, headers):
+        async def connect():
+            socket = WebSocket(headers)
+            message = await socket.next()
+            if message["type"] == "websocket.accept":
+                await socket.next()
+                await socket.close()
+            return message
+
+        return asyncio.run(connect())
+
+    @pytest.mark.parametrize(
+        "origin", ["http://localhost:3000", "https://app.vercel.app", None]
+    )
+    def test_session_handshakes_from_our_sites_are_accepted(self, origin):
+        headers = [session_cookie(baker.make(User))]
+        if origin:
+            headers.append((b"origin", origin.encode()))
+
+        assert self.handshake(headers)["type"] == "websocket.accept"
+
+    @pytest.mark.parametrize(
+        "origin", ["https://evil.example", "null", "https://localhost.evil.example"]
+    )
+    def test_handshakes_from_other_sites_are_refused(self, origin):
+        headers = [session_cookie(baker.make(User)), (b"origin", origin.encode())]
+
+        assert self.handshake(headers) == {"type": "websocket.close", "code": 4403}
+
+    def test_csrf_trusted_origins_are_accepted(self, settings):
+        settings.CSRF_TRUSTED_ORIGINS = ["https://*.example.com"]
+        headers = [
+            session_cookie(baker.make(User)),
+            (b"origin", b"https://app.example.com"),
+        ]
+
+        assert self.handshake(headers)["type"] == "websocket.accept"
+
+
+def test_other_paths_are_passed_to_django():
+    async def request():
+        connection = Connection({"type": "http", "path": "/v1/transaction/"})
+        return await connection.next()
+
+    assert asyncio.run(request())["status"] == 204
+
+
+def test_slow_subscribers_are_told_to_catch_up(settings):
+    settings.EVENTS_QUEUE_SIZE = 2
+    broker = events.get_broker()
+
+    async def publish():
+        with broker.subscribe(1) as subscription:
+            for message in ["a", "b", "c"]:
+                broker.publish(1, message)
+            await asyncio.sleep(0)
+            return [subscription.queue.get_nowait()], subscription.queue.empty()
+
+    assert asyncio.run(publish()) == ([events.CATCH_UP], True)
+    assert not broker.listening(1)
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import logging
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory
+from model_bakery import baker
+from rest_framework import status
+
+from app import ledger
+from app.instrumentation import RequestTimingMiddleware, Timings, query_shape
+from app.models import Category, Transaction
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestRequestTiming:
+    endpoint = "/v1/transaction/"
+
+    @pytest.fixture
+    def user(self, api_client, settings):
+        settings.REQUEST_TIMING_SAMPLE_RATE = 1
+        settings.REQUEST_TIMING_HEADER = True
+        user = baker.make(User)
+        api_client.force_authenticate(user=user)
+        baker.make(Transaction, user=user, category=baker.make(Category), _quantity=3)
+        return user
+
+    def test_list_reports_queries_and_phases(self, user, api_client, caplog):
+        with caplog.at_level(logging.INFO, logger="app.instrumentation"):
+            res = api_client.get(self.endpoint)
+
+        assert res.status_code == status.HTTP_200_OK
+        timing = res["Server-Timing"]
+        for phase in ["db;", "view;", "serialize;", "total;"]:
+            assert phase in timing
+
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record["view"] == "transaction-list"
+        assert record["status"] == 200
+        assert record["queries"] > 0
+        assert 0 < len(record["slowest"]) <= 3
+        assert record["repeated"] == []
+
+    def test_repeated_statements_are_flagged(
+        self, user, api_client, settings, caplog, monkeypatch
+    ):
+        get_totals = ledger.get_totals
+
+        def get_totals_per_row(user):
+            for row in Transaction.objects.filter(user_id=user.id).values("id"):
+                Transaction.objects.filter(pk=row["id"]).exists()
+            return get_totals(user)
+
+        monkeypatch.setattr(ledger, "get_totals", get_totals_per_row)
+        settings.REQUEST_TIMING_REPEATED_QUERIES = 3
+        with caplog.at_level(logging.INFO, logger="app.instrumentation"):
+            res = api_client.get(self.endpoint)
+
+        assert "nplusone;" in res["Server-Timing"]
+        assert caplog.records[-1].levelno == logging.WARNING
+
+    def test_unsampled_requests_are_untouched(self, user, api_client, settings):
+        settings.REQUEST_TIMING_SAMPLE_RATE = 0
+
+        res = api_client.get(self.endpoint)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert "Server-Timing" not in res
+
+
+# The queries run in other threads, which don't see the test transaction.
+@pytest.mark.django_db(transaction=True)
+def test_async_requests_record_their_own_queries(settings, caplog):
+    settings.REQUEST_TIMING_SAMPLE_RATE = 1
+
+    def count():
+        return Transaction.objects.count()
+
+    async def view(request):
+        await sync_to_async(count)()
+        await sync_to_async(count, thread_sensitive=False)()
+        return HttpResponse()
+
+    middleware = RequestTimingMiddleware(view)
+    assert asyncio.iscoroutinefunction(middleware)
+
+    async def requests():
+        return await asyncio.gather(
+            *(middleware(RequestFactory().get("/")) for _ in range(2))
+        )
+
+    with caplog.at_level(logging.INFO, logger="app.instrumentation"):
+        asyncio.run(requests())
+
+    records = [json.loads(record.getMessage()) for record in caplog.records]
+    assert [record["queries"] for record in records] == [2, 2]
+
+
+def test_in_lists_of_any_length_share_a_shape():
+    timings = Timings()
+    for sql in [
+        "SELECT 1 FROM t WHERE id IN (%s, %s)",
+        "SELECT 1 FROM t WHERE id IN (%s, %s, %s)",
+        "SELECT 1 FROM t WHERE id = %s",
+    ]:
+        timings.record_query(lambda *args: None, sql, None, False, {})
+
+    assert query_shape("x IN (%s,%s, %s)") == "x IN (%s, ...)"
+    assert timings.repeated(2) == [("SELECT 1 FROM t WHERE id IN (%s, ...)", 2)]
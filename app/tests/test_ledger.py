@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from model_bakery import baker
+
+from app import category_cache, ledger
+from app.models import Balance, Category, Transaction
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestLedger:
+    def test_create_update_delete_keep_balance_in_sync(self):
+        user = baker.make(User)
+        income = baker.make(Category, name="income")
+        expense = baker.make(Category, name="expense")
+
+        salary = baker.make(Transaction, user=user, category=income, amount=100)
+        rent = baker.make(Transaction, user=user, category=expense, amount=40)
+        assert ledger.get_totals(user)["balance"] == Decimal("60")
+
+        rent.amount = 50
+        rent.save()
+        salary.category = expense
+        salary.save()
+        totals = ledger.get_totals(user)
+        assert totals["income"] == 0
+        assert totals["expense"] == Decimal("150")
+
+        salary.delete()
+        assert ledger.get_totals(user)["balance"] == Decimal("-50")
+
+    def test_renaming_a_category_moves_its_totals(self, api_client):
+        api_client.force_authenticate(user=baker.make(User, is_staff=True))
+        user = baker.make(User)
+        other = baker.make(Category, name="other")
+        baker.make(Category, name="income")
+        baker.make(Transaction, user=user, category=other, amount=30)
+        assert ledger.get_totals(user)["income"] == 0
+
+        res = api_client.patch(f"/v1/category/{other.id}/", {"name": "income"})
+        assert res.status_code == 200
+        assert ledger.get_totals(user)["income"] == Decimal("30")
+        assert ledger.rebuild(commit=False) == []
+
+        other.name = "gifts"
+        other.save()
+        assert ledger.get_totals(user)["income"] == 0
+        assert ledger.rebuild(commit=False) == []
+
+        # Renamed by another worker: this one's category cache isn't told.
+        assert category_cache.get_name(other.id) == "gifts"
+        Category.objects.filter(pk=other.pk).update(name="income")
+        ledger.rebuild()
+        baker.make(Transaction, user=user, category=other, amount=5)
+        assert ledger.get_totals(user)["income"] == Decimal("35")
+
+    def test_rebuild_ledger_repairs_drift(self):
+        user = baker.make(User)
+        category = baker.make(Category, name="income")
+        baker.make(Transaction, user=user, category=category, amount=25)
+        Balance.objects.filter(user=user).update(income=0, balance=0)
+
+        with pytest.raises(CommandError):
+            call_command("rebuild_ledger", "--verify")
+        call_command("rebuild_ledger")
+
+        assert ledger.get_totals(user)["balance"] == Decimal("25")
+        call_command("rebuild_ledger", "--verify")
@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.test import RequestFactory
+from rest_framework import status
+
+from app import metrics
+from app.models import Transaction
+
+ROUTE = 'route="transaction-list",method="GET",status="200"'
+
+
+@pytest.fixture(autouse=True)
+def registry():
+    metrics.registry.reset()
+    yield metrics.registry
+    metrics.registry.reset()
+
+
+@pytest.mark.django_db
+class TestMetrics:
+    def test_requests_are_counted_per_route(self, authenticated_user, api_client):
+        api_client.get("/v1/transaction/")
+        api_client.get("/v1/transaction/")
+
+        res = api_client.get("/metrics")
+
+        assert res.status_code == status.HTTP_200_OK
+        body = res.content.decode()
+        assert f"http_requests_total{{{ROUTE}}} 2" in body
+        assert f'http_request_duration_seconds_bucket{{{ROUTE},le="+Inf"}} 2' in body
+        assert f"http_request_duration_seconds_count{{{ROUTE}}} 2" in body
+        assert 'db_queries_total{route="transaction-list"}' in body
+        assert 'db_connections_reused_total{alias="default"}' in body
+
+    def test_snapshots_of_other_processes_are_added(
+        self, authenticated_user, api_client, settings, tmp_path
+    ):
+        settings.METRICS_DIR = str(tmp_path)
+        other = {
+            "counters": [
+                ["http_requests_total", ["transaction-list", "GET", "200"], 5]
+            ],
+            "histograms": [
+                [["transaction-list", "GET", "200"], [5] + [0] * 11 + [0.01]]
+            ],
+        }
+        (tmp_path / "metrics-1.json").write_text(json.dumps(other))
+
+        api_client.get("/v1/transaction/")
+        res = api_client.get("/metrics")
+
+        body = res.content.decode()
+        assert f"http_requests_total{{{ROUTE}}} 6" in body
+        assert f"http_request_duration_seconds_count{{{ROUTE}}} 6" in body
+        assert list(tmp_path.glob("metrics-*.json")) != [tmp_path / "metrics-1.json"]
+
+    def test_token_is_required_when_configured(self, api_client, settings):
+        settings.METRICS_TOKEN = "secret"
+
+        assert api_client.get("/metrics").status_code == status.HTTP_403_FORBIDDEN
+        res = api_client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        assert res.status_code == status.HTTP_200_OK
+
+    def test_outside_addresses_need_a_token(self, api_client):
+        res = api_client.get("/metrics", REMOTE_ADDR="93.184.216.34")
+        assert res.status_code == status.HTTP_403_FORBIDDEN
+        res = api_client.get("/metrics", REMOTE_ADDR="10.1.2.3")
+        assert res.status_code == status.HTTP_200_OK
+
+
+# The queries run in other threads, which don't see the test transaction.
+@pytest.mark.django_db(transaction=True)
+def test_async_requests_count_their_own_queries(registry):
+    async def view(request):
+        await sync_to_async(Transaction.objects.count)()
+        await sync_to_async(Transaction.objects.count, thread_sensitive=False)()
+        return HttpResponse()
+
+    middleware = metrics.MetricsMiddleware(view)
+    assert asyncio.iscoroutinefunction(middleware)
+
+    async def requests():
+        await asyncio.gather(*(middleware(RequestFactory().get("/")) for _ in range(3)))
+
+    asyncio.run(requests())
+
+    counters, _ = metrics.collect()
+    assert counters[("http_requests_total", ("unmatched", "GET", "200"))] == 3
+    assert counters[("db_queries_total", ("unmatched",))] == 6
@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from model_bakery import baker
+
+from app import bulk, partitions
+from app.models import (
+    ArchivedTransaction,
+    Balance,
+    Category,
+    MonthlyRollup,
+    TitleSuggestion,
+    Transaction,
+)
+
+User = get_user_model()
+
+
+def test_months_are_utc_calendar_months():
+    start = partitions.month_start(datetime(2024, 12, 31, 23, 30, tzinfo=timezone.utc))
+
+    assert start == datetime(2024, 12, 1, tzinfo=timezone.utc)
+    assert partitions.next_month(start) == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert partitions.partition_name(start) == "app_transaction_p202412"
+
+
+@pytest.mark.django_db
+def test_sqlite_keeps_the_single_table(settings):
+    settings.TRANSACTION_PARTITIONING = True
+
+    baker.make(Transaction, _quantity=2)
+
+    assert not partitions.is_partitioned()
+    assert partitions.ensure_ahead() == []
+    assert partitions.archive(datetime.now(timezone.utc)) == []
+    assert Transaction.objects.count() == 2
+    with pytest.raises(CommandError):
+        call_command("transaction_partitions", "ensure")
+
+
+@pytest.fixture
+def archive_table():
+    # Created by partitions.archive() on PostgreSQL; make one here by hand.
+    with connection.schema_editor() as editor:
+        editor.create_model(ArchivedTransaction)
+    yield
+    with connection.schema_editor() as editor:
+        editor.delete_model(ArchivedTransaction)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rebuilds_count_archived_rows(archive_table):
+    user = baker.make(User)
+    expense = baker.make(Category, name="expense")
+    baker.make(Transaction, user=user, category=expense, title="Rent", amount=500)
+    ArchivedTransaction.objects.create(
+        id=1000,
+        user=user,
+        category=expense,
+        title="Rent",
+        amount=400,
+        created_at=datetime(2020, 1, 5, tzinfo=timezone.utc),
+        last_updated=datetime(2020, 1, 5).date(),
+    )
+
+    bulk.refresh_summaries([user.id])
+
+    assert Balance.objects.get(user=user).expense == 900
+    assert MonthlyRollup.objects.filter(user=user).count() == 2
+    assert TitleSuggestion.objects.get(user=user).count == 2
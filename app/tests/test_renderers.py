@@ -0,0 +1,93 @@
+import datetime
+import decimal
+import uuid
+from zoneinfo import ZoneInfo
+
+import msgpack
+import pytest
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from app.models import Category, Transaction
+from app.renderers import FastJSONRenderer
+
+
+def test_fast_json_matches_drf_json_renderer():
+    data = {
+        "amount": decimal.Decimal("12.50"),
+        "when": datetime.datetime(
+            2024, 1, 2, 3, 4, 5, 6, tzinfo=datetime.timezone.utc
+        ),
+        "day": datetime.date(2024, 1, 2),
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "title": "Café",
+        "items": (1, 2),
+    }
+
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_fast_json_formats_dates_and_times_like_drf():
+    data = [
+        datetime.datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=datetime.timezone.utc),
+        datetime.datetime(
+            2024, 7, 2, 3, 4, 5, 120000, tzinfo=ZoneInfo("Europe/London")
+        ),
+        datetime.datetime(2024, 1, 2, 3, 4, 5),
+        datetime.datetime(
+            2024, 1, 2, tzinfo=datetime.timezone(datetime.timedelta(seconds=30))
+        ),
+        datetime.time(1, 2, 3, 4),
+    ]
+
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+@pytest.mark.django_db
+def test_suggestions_render_like_drf(authenticated_user, api_client):
+    category = baker.make(Category, name="expense")
+    baker.make(Transaction, user=authenticated_user, category=category, title="Tea")
+
+    res = api_client.get("/v1/transaction/suggest/", {"q": "te"})
+
+    assert res.data[0]["last_used"].microsecond
+    assert res.content == JSONRenderer().render(res.data)
+
+
+@pytest.mark.django_db
+class TestMessagePack:
+    endpoint = "/v1/transaction/"
+
+    def test_list_is_rendered_as_msgpack_when_accepted(
+        self, authenticated_user, api_client
+    ):
+        category = baker.make(Category, name="income")
+        baker.make(
+            Transaction,
+            user=authenticated_user,
+            category=category,
+            amount=3,
+            _quantity=2,
+        )
+
+        res = api_client.get(self.endpoint, HTTP_ACCEPT="application/msgpack")
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res["Content-Type"] == "application/msgpack"
+        data = msgpack.unpackb(res.content, raw=False)
+        assert data["results"]["income"] == 6
+        assert data["results"]["transactions"][0]["amount"] == "3.00"
+
+    def test_bulk_accepts_msgpack_payload(self, authenticated_user, api_client):
+        baker.make(Category, name="expense")
+        rows = [{"category": "expense", "title": "tea", "amount": "2.5"}] * 3
+
+        res = api_client.post(
+            f"{self.endpoint}bulk/",
+            msgpack.packb(rows),
+            content_type="application/msgpack",
+        )
+
+        assert res.status_code == status.HTTP_201_CREATED
+        assert res.data["created"] == 3
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory
+from model_bakery import baker
+
+from app import checks, replicas
+from app.models import Category, Transaction
+
+User = get_user_model()
+
+
+@pytest.fixture
+def replica(settings, tmp_path, shared_cache):
+    # A second SQLite file standing in for a replica that hasn't caught up.
+    connections.databases["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": str(tmp_path / "replica.sqlite3"),
+    }
+    call_command("migrate", database="replica", verbosity=0)
+    settings.DATABASE_REPLICAS = ["replica"]
+    replicas.reset()
+    replicas.probe("replica")
+    yield "replica"
+    replicas.reset()
+    connections["replica"].close()
+    del connections["replica"]
+    del connections.databases["replica"]
+
+
+@pytest.mark.django_db
+class TestReplicaRouting:
+    endpoint = "/v1/transaction/"
+
+    @pytest.fixture
+    def user(self, api_client, replica):
+        user = baker.make(User)
+        User.objects.using(replica).bulk_create([user])
+        api_client.force_authenticate(user=user)
+        return user
+
+    def titles(self, res):
+        return [row["title"] for row in res.data["results"]["transactions"]]
+
+    def test_reads_go_to_the_replica(self, user, api_client):
+        category = baker.make(Category, name="expense")
+        baker.make(Transaction, user=user, category=category, title="Primary")
+
+        assert self.titles(api_client.get(self.endpoint)) == []
+
+    def test_own_writes_are_read_from_the_primary(self, user, api_client, settings):
+        category = baker.make(Category, name="expense")
+        res = api_client.post(
+            self.endpoint, {"title": "Coffee", "amount": 3, "category": category.name}
+        )
+        assert res.status_code == 201
+
+        assert self.titles(api_client.get(self.endpoint)) == ["Coffee"]
+
+        settings.READ_YOUR_WRITES_SECONDS = 0
+        api_client.post(
+            self.endpoint, {"title": "Tea", "amount": 2, "category": category.name}
+        )
+        replicas.cache.delete(replicas.write_key(user.pk))
+        assert self.titles(api_client.get(self.endpoint)) == []
+
+    def test_lagging_replica_falls_back_to_the_primary(
+        self, user, api_client, monkeypatch
+    ):
+        baker.make(Transaction, user=user, title="Primary")
+        monkeypatch.setattr(replicas, "measure_lag", lambda alias: 60)
+        replicas.probe("replica")
+
+        assert self.titles(api_client.get(self.endpoint)) == ["Primary"]
+
+    def test_lag_is_measured_off_the_request(self, replica, monkeypatch):
+        released, measured = threading.Event(), threading.Event()
+
+        def measure_lag(alias):
+            released.wait(5)
+            measured.set()
+            return 0
+
+        monkeypatch.setattr(replicas, "measure_lag", measure_lag)
+        replicas.reset()
+
+        # An unmeasured replica isn't used, and the caller doesn't wait.
+        assert not replicas.healthy(replica)
+        released.set()
+        assert measured.wait(5)
+        for thread in threading.enumerate():
+            if thread.name == f"replica-lag-{replica}":
+                thread.join(5)
+        assert replicas.healthy(replica)
+
+    def test_async_requests_are_routed(self, user):
+        router = replicas.ReplicaRouter()
+
+        async def view(request):
+            alias = await sync_to_async(router.db_for_read)(Transaction)
+            return HttpResponse(alias)
+
+        middleware = replicas.ReplicaRoutingMiddleware(view)
+        assert asyncio.iscoroutinefunction(middleware)
+
+        res = asyncio.run(middleware(RequestFactory().get(self.endpoint)))
+        assert res.content == b"replica"
+
+
+def test_replicas_need_a_shared_cache(settings):
+    settings.DATABASE_REPLICAS = ["replica"]
+    router = replicas.ReplicaRouter()
+    middleware = replicas.ReplicaRoutingMiddleware(
+        lambda request: HttpResponse(router.db_for_read(Transaction))
+    )
+
+    res = middleware(RequestFactory().get("/v1/transaction/"))
+
+    assert res.content == b"default"
+    assert [warning.id for warning in checks.check_shared_cache(None)] == [
+        "app.W001",
+        "app.W002",
+    ]
+
+
+def test_writes_and_reads_outside_requests_use_the_primary(settings):
+    settings.DATABASE_REPLICAS = ["replica"]
+    router = replicas.ReplicaRouter()
+
+    assert router.db_for_read(Transaction) == "default"
+    assert router.db_for_write(Transaction) == "default"
@@ -0,0 +1,90 @@
+import pytest
+from django.core.management import call_command
+from model_bakery import baker
+from rest_framework import status
+
+from app.models import Category, MonthlyRollup, Transaction
+
+
+def make_transaction(user, category, amount, created_at):
+    obj = baker.make(Transaction, user=user, category=category, amount=amount)
+    # created_at is auto_now_add and update() sends no signals, so callers
+    # rebuild the rollups afterwards.
+    Transaction.objects.filter(pk=obj.pk).update(created_at=created_at)
+    return obj
+
+
+@pytest.mark.django_db
+class TestMonthlyRollup:
+    endpoint = "/v1/analytics/"
+
+    def test_rollups_follow_transaction_writes(self, authenticated_user):
+        category = baker.make(Category, name="expense")
+        obj = baker.make(
+            Transaction, user=authenticated_user, category=category, amount=10
+        )
+        baker.make(Transaction, user=authenticated_user, category=category, amount=5)
+
+        rollup = MonthlyRollup.objects.get(user=authenticated_user)
+        assert (rollup.total, rollup.count) == (15, 2)
+
+        obj.amount = 20
+        obj.save()
+        obj.delete()
+        rollup.refresh_from_db()
+        assert (rollup.total, rollup.count) == (5, 1)
+
+    def test_analytics_groups_by_month_and_category(
+        self, authenticated_user, api_client
+    ):
+        income = baker.make(Category, name="income")
+        expense = baker.make(Category, name="expense")
+        make_transaction(authenticated_user, income, 100, "2024-01-10T00:00:00Z")
+        make_transaction(authenticated_user, expense, 30, "2024-01-20T00:00:00Z")
+        make_transaction(authenticated_user, expense, 20, "2024-03-05T00:00:00Z")
+        make_transaction(authenticated_user, expense, 99, "2023-03-05T00:00:00Z")
+        call_command("rebuild_rollups")
+
+        res = api_client.get(self.endpoint, {"year": 2024})
+
+        assert res.status_code == status.HTTP_200_OK
+        assert [row["month"] for row in res.data["results"]] == [1, 3]
+        assert res.data["results"][0]["categories"] == {"income": 100, "expense": 30}
+
+        res = api_client.get(self.endpoint, {"year": 2024, "group_by": "category"})
+
+        totals = {row["category"]: row["total"] for row in res.data["results"]}
+        assert totals == {"income": 100, "expense": 50}
+
+    def test_category_counts_come_from_the_users_rollups(
+        self, authenticated_user, api_client
+    ):
+        authenticated_user.is_staff = True
+        authenticated_user.save()
+        income = baker.make(Category, name="income")
+        expense = baker.make(Category, name="expense")
+        baker.make(
+            Transaction,
+            user=authenticated_user,
+            category=expense,
+            amount=5,
+            _quantity=2,
+        )
+        baker.make(Transaction, category=expense, amount=7, _quantity=3)
+
+        res = api_client.get("/v1/category/")
+
+        counts = {row["name"]: row["transaction_count"] for row in res.data["results"]}
+        assert counts == {"income": 0, "expense": 2}
+
+        res = api_client.get("/v1/transaction/")
+        assert res.data["results"]["categories"] == [
+            {"category": "expense", "count": 2, "total": 10}
+        ]
+
+        baker.make(Transaction, user=authenticated_user, category=income, amount=1)
+        res = api_client.get("/v1/transaction/")
+        assert res.data["results"]["categories"] == [
+            {"category": "income", "count": 1, "total": 1},
+            {"category": "expense", "count": 2, "total": 10},
+        ]
@@ -0,0 +1,36 @@
+import pytest
+from model_bakery import baker
+from rest_framework import status
+
+from app.models import Category, Transaction
+
+
+@pytest.mark.django_db
+class TestTransactionSearch:
+    endpoint = "/v1/transaction/"
+
+    @pytest.fixture(autouse=True)
+    def transactions(self, authenticated_user):
+        category = baker.make(Category, name="expense")
+        for title in ["Coffee beans", "Coffee coffee coffee", "Groceries", "Cab"]:
+            baker.make(
+                Transaction, user=authenticated_user, category=category, title=title
+            )
+        baker.make(Transaction, category=category, title="Coffee")
+
+    def titles(self, res):
+        return [row["title"] for row in res.data["results"]["transactions"]]
+
+    def test_search_matches_word_prefixes_ranked(self, api_client):
+        res = api_client.get(self.endpoint, {"search": "cof"})
+
+        assert res.status_code == status.HTTP_200_OK
+        assert self.titles(res) == ["Coffee coffee coffee", "Coffee beans"]
+
+    def test_search_follows_title_updates_and_ordering(self, api_client):
+        Transaction.objects.filter(title="Cab").update(title="Coffee to go")
+        Transaction.objects.filter(title="Coffee beans").delete()
+
+        res = api_client.get(self.endpoint, {"search": "coffee", "ordering": "id"})
+
+        assert self.titles(res) == ["Coffee coffee coffee", "Coffee to go"]
@@ -0,0 +1,81 @@
+import pytest
+from django.core.management import call_command
+from model_bakery import baker
+from rest_framework import status
+
+from app.models import Category, TitleSuggestion, Transaction
+
+
+@pytest.mark.django_db
+class TestTitleSuggestions:
+    endpoint = "/v1/transaction/suggest/"
+
+    @pytest.mark.parametrize("cache_users", [0, 10])
+    def test_suggest_returns_most_used_titles_for_prefix(
+        self, authenticated_user, api_client, settings, cache_users
+    ):
+        settings.SUGGESTION_CACHE_USERS = cache_users
+        income = baker.make(Category, name="income")
+        expense = baker.make(Category, name="expense")
+        baker.make(
+            Transaction,
+            user=authenticated_user,
+            category=expense,
+            title="Coffee",
+            _quantity=3,
+        )
+        baker.make(
+            Transaction, user=authenticated_user, category=income, title="coffee "
+        )
+        baker.make(Transaction, user=authenticated_user, category=expense, title="Cola")
+        baker.make(Transaction, user=authenticated_user, category=expense, title="Rent")
+        baker.make(Transaction, category=expense, title="Cocoa")
+
+        res = api_client.get(self.endpoint, {"q": "Co"})
+
+        assert res.status_code == status.HTTP_200_OK
+        assert [(row["title"], row["count"]) for row in res.data] == [
+            ("coffee", 4),
+            ("Cola", 1),
+        ]
+        assert res.data[0]["category"] == "expense"
+
+    def test_suggestions_follow_edits_and_deletes(self, authenticated_user):
+        category = baker.make(Category, name="expense")
+        obj = baker.make(
+            Transaction, user=authenticated_user, category=category, title="Taxi"
+        )
+
+        obj.title = "Train"
+        obj.save()
+        assert list(TitleSuggestion.objects.values_list("normalized", "count")) == [
+            ("train", 1)
+        ]
+
+        obj.delete()
+        assert not TitleSuggestion.objects.exists()
+
+    def test_rebuild_suggestions_matches_incremental_rows(self, authenticated_user):
+        category = baker.make(Category, name="expense")
+        baker.make(
+            Transaction,
+            user=authenticated_user,
+            category=category,
+            title="Bus",
+            _quantity=2,
+        )
+        expected = list(
+            TitleSuggestion.objects.values_list("normalized", "count", "category_id")
+        )
+        TitleSuggestion.objects.all().delete()
+
+        call_command("rebuild_suggestions")
+
+        assert (
+            list(
+                TitleSuggestion.objects.values_list(
+                    "normalized", "count", "category_id"
+                )
+            )
+            == expected
+        )
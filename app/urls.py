@@ -1,6 +1,8 @@
 from django.urls import path, include
 from rest_framework import routers
+from . import async_views
 from .views import (
+    AnalyticsViewSet,
     CategoryViewSet,
     TransactionViewSet,
     UserViewSet,
@@ -18,7 +20,16 @@ router.register(r"register", UserRegister, basename="register")
 router.register(r"login", UserLogin, basename="login")
 router.register(r"logout", UserLogout, basename="logout")
 router.register(r"csrf", CSRF, basename='csrf')
+router.register(r"analytics", AnalyticsViewSet, basename="analytics")
+
+async_urlpatterns = [
+    path("transaction/", async_views.transaction_list),
+    path("transaction/<int:pk>/", async_views.transaction_detail),
+    path("balance/", async_views.balance),
+    path("category/", async_views.category_list),
+]
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("async/", include(async_urlpatterns)),
 ]
\ No newline at end of file
@@ -0,0 +1,92 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from . import category_cache
+from .models import Balance
+
+
+def get(user_id):
+    """
+    Return a user's data version with one primary key lookup.
+
+    The version lives on the user's Balance row and is bumped by
+    ledger.apply_delta, which runs for every Transaction write.
+    """
+    version = (
+        Balance.objects.filter(user_id=user_id)
+        .values_list("version", flat=True)
+        .first()
+    )
+    return version or 0
+
+
+def _plain(data):
+    # Serializer return types keep a reference to their serializer, which
+    # can't be pickled into the cache.
+    if isinstance(data, (dict, ReturnDict)):
+        return {key: _plain(value) for key, value in data.items()}
+    if isinstance(data, (list, ReturnList)):
+        return [_plain(value) for value in data]
+    return data
+
+
+class ConditionalGetMixin:
+    """
+    Answer list and detail GETs with a strong ETag built from the user's
+    data version, the category table and the request, returning 304 when
+    the client already has it. There's no Last-Modified: the category
+    table has no modification time, so only the ETag can tell the client
+    its copy is stale. Responses can also be cached by setting
+    ``RESPONSE_CACHE_TIMEOUT`` to a number of seconds.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+
+        version = get(request.user.id)
+        # Lets the handler key its own caches without reading it again.
+        self.data_version = version
+        key = ":".join(
+            [
+                str(request.user.id),
+                str(version),
+                category_cache.fingerprint(),
+                request.get_full_path(),
+                request.META.get("HTTP_ACCEPT", ""),
+            ]
+        )
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        etag = f'"{digest}"'
+        headers = {"ETag": etag}
+
+        etags = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        if etag in etags or "*" in etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        timeout = getattr(settings, "RESPONSE_CACHE_TIMEOUT", 0)
+        cache_key = f"response:{digest}"
+        if timeout:
+            data = cache.get(cache_key)
+            if data is not None:
+                return Response(data, headers=headers)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            for name, value in headers.items():
+                response[name] = value
+            if timeout:
+                cache.set(cache_key, _plain(response.data), timeout)
+        return response
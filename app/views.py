@@ -1,29 +1,52 @@
+import csv
+from datetime import timezone as dt_timezone
+
 from django.contrib.auth import get_user_model, login, logout
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db.models import Case, DecimalField, F, Sum, Value, When
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, permissions, serializers, status, viewsets
 from rest_framework.authentication import SessionAuthentication
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.middleware.csrf import get_token
 
+from . import batch, bulk, category_cache, changes, export, ledger, rollups, suggestions
+from .authentication import (
+    SignedTokenAuthentication,
+    issue_token,
+    revoke_tokens,
+)
 from .filters import TransactionFilter
-from .models import Category, Transaction
+from .instrumentation import TimedViewMixin
+from .models import Category, MonthlyRollup, Transaction
+from .pagination import TransactionCursorPagination, WindowPageNumberPagination
+from .search import TransactionOrderingFilter, TransactionSearchFilter
 from .serializers import (
     CategorySerializer,
+    TransactionListSerializer,
     TransactionSerializer,
     UserLoginSerializer,
     UserRegistrationSerializer,
     UserSerializer,
 )
 from .validations import custom_validation
-from django.db.models import Count, Q
+from .versioning import ConditionalGetMixin
+from django.db.models import Sum
+from django.db.models.functions import ExtractMonth
+from django.utils import timezone
 
 User = get_user_model()
 
 
+def list_rows(queryset):
+    """Plain rows for TransactionListSerializer, month computed in SQL."""
+    return queryset.values(*TransactionListSerializer.fields).annotate(
+        month=ExtractMonth("created_at", tzinfo=dt_timezone.utc)
+    )
+
+
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (permissions.IsAdminUser,)
 
@@ -87,7 +110,7 @@ class UserLogin(
         if serializer.is_valid(raise_exception=True):
             user = serializer.check_user(request.data)
             login(request, user)
-            data = serializer.data
+            data = {**serializer.data, "token": issue_token(user)}
             return Response(
                 data,
                 status=status.HTTP_200_OK,
@@ -99,38 +122,48 @@ class UserLogout(
     generics.CreateAPIView,
 ):
     authentication_classes = [
+        SignedTokenAuthentication,
         SessionAuthentication,
     ]
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = serializers.Serializer
 
     def create(self, request):
+        revoke_tokens(request.user.id)
         logout(request)
         return Response(
             {"detail": "Successfully logged out."}, status=status.HTTP_200_OK
         )
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(TimedViewMixin, ConditionalGetMixin, viewsets.ModelViewSet):
 
     serializer_class = CategorySerializer
     permission_classes = (permissions.IsAdminUser,)
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = Category.objects.annotate(
-            transaction_count=Count("transaction", filter=Q(transaction__user=user))
+        return Category.objects.order_by("id")
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["category_totals"] = rollups.category_totals(
+            self.request.user.id, getattr(self, "data_version", None)
         )
-        return queryset
+        return context
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(TimedViewMixin, ConditionalGetMixin, viewsets.ModelViewSet):
 
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [
+        DjangoFilterBackend,
+        TransactionSearchFilter,
+        TransactionOrderingFilter,
+    ]
     search_fields = [
         "title",
     ]
     ordering_fields = ["created_at", "amount", "month"]
+    ordering = ["-created_at", "-id"]
     filterset_fields = [
         "category",
     ]
@@ -138,40 +171,48 @@ class TransactionViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        return Transaction.objects.select_related("user", "category").filter(
-            user_id=user.id
-        )
-
-    def get_paginated_response(self, data):
-        queryset = self.get_queryset()
-
-        balance_info = queryset.aggregate(
-            income=Sum(
-                Case(
-                    When(category__name="income", then=F("amount")),
-                    default=Value(0),
-                    output_field=DecimalField(),
-                )
-            ),
-            expense=Sum(
-                Case(
-                    When(category__name="expense", then=F("amount")),
-                    default=Value(0),
-                    output_field=DecimalField(),
-                )
-            ),
-        )
+        queryset = Transaction.objects.filter(user_id=user.id)
+        if self.action in ("list", "export"):
+            return list_rows(queryset)
+        return queryset
 
-        total_income = balance_info["income"] or 0
-        total_expenses = balance_info["expense"] or 0
+    def get_serializer_class(self):
+        if self.action == "list":
+            return TransactionListSerializer
+        return super().get_serializer_class()
+
+    @property
+    def paginator(self):
+        """
+        ``?pagination=cursor`` (or following a cursor link) switches to keyset
+        pagination; ``?pagination=window`` fetches the page, count and
+        filtered totals in a single query.
+        """
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            mode = params.get("pagination")
+            if mode == "cursor" or "cursor" in params:
+                self._paginator = TransactionCursorPagination()
+            elif mode == "window":
+                self._paginator = WindowPageNumberPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
 
-        balance = total_income - total_expenses
+    def get_paginated_response(self, data):
+        totals = ledger.get_totals(self.request.user)
         response = {
-            "income": total_income,
-            "expense": total_expenses,
-            "balance": balance,
+            "income": totals["income"],
+            "expense": totals["expense"],
+            "balance": totals["balance"],
             "transactions": data,
         }
+        response["categories"] = rollups.category_breakdown(
+            self.request.user.id, getattr(self, "data_version", None)
+        )
+        filtered = getattr(self.paginator, "totals", None)
+        if filtered is not None:
+            response["filtered"] = filtered
         return super().get_paginated_response(response)
 
     def get_serializer_context(self):
@@ -193,4 +234,216 @@ class TransactionViewSet(viewsets.ModelViewSet):
             serializer.data, status=status.HTTP_201_CREATED, headers=headers
         )
 
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Create many transactions at once from a JSON (or MessagePack) array
+        or a CSV file uploaded as ``file``. Invalid rows are reported and skipped unless
+        ``?atomic=true`` is given, in which case nothing is written.
+        """
+        if "file" in request.FILES:
+            rows = bulk.iter_csv_rows(request.FILES["file"])
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            return Response(
+                {"detail": "Send a JSON array or a CSV file."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            batch_size = int(request.query_params.get("batch_size", 0)) or None
+            if batch_size is not None and batch_size < 0:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {"detail": "batch_size must be a positive number."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            objs, errors = bulk.validate_rows(request.user, rows)
+        except bulk.TooManyRows as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except (UnicodeDecodeError, csv.Error):
+            return Response(
+                {"detail": "Could not read the CSV file."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        atomic = request.query_params.get("atomic") in ("1", "true")
+        if errors and (atomic or not objs):
+            return Response(
+                {"created": 0, "errors": errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        created = bulk.create_transactions(request.user, objs, batch_size)
+        return Response(
+            {"created": len(created), "errors": errors},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        """
+        Apply a JSON (or MessagePack) array of create, update and delete
+        operations, by id or by filter, in one database transaction; see
+        app/batch.py. Returns one result per operation, or the errors and
+        no changes at all.
+        """
+        if not isinstance(request.data, list):
+            return Response(
+                {"detail": "Send a JSON array of operations."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            results = batch.run(request.user, request.data)
+        except bulk.TooManyRows as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except batch.BatchError as e:
+            return Response({"errors": e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": results})
+
+    @action(detail=False, methods=["get"])
+    def suggest(self, request):
+        """
+        Title suggestions for ``?q=<prefix>``, most used first, each with
+        the category it is most often recorded under.
+        """
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), 50)
+        except ValueError:
+            limit = 10
+        rows = suggestions.suggest(
+            request.user.id, request.query_params.get("q", ""), max(limit, 1)
+        )
+        return Response(
+            [
+                {
+                    "title": row["title"],
+                    "category": category_cache.get_name(row["category_id"]),
+                    "count": row["count"],
+                    "last_used": row["last_used"],
+                }
+                for row in rows
+            ]
+        )
+
+    @action(detail=False, methods=["get"])
+    def changes(self, request):
+        """
+        Transactions created, updated or deleted after ``?since=<seq>``
+        (0 for everything), oldest change first and at most ``?limit=`` of
+        them. Repeat with ``since`` set to the returned ``next`` while
+        ``has_more`` is true; ``deleted`` lists the ids to drop.
+        """
+        max_limit = getattr(settings, "CHANGE_FEED_BATCH_SIZE", 500)
+        try:
+            since = int(request.query_params.get("since", 0))
+            limit = int(request.query_params.get("limit", max_limit))
+            if since < 0 or limit < 1:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {"detail": "since and limit must be positive numbers."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        rows, deleted, next_seq, has_more = changes.since(
+            request.user.id, since, min(limit, max_limit)
+        )
+        for row in rows:
+            row["month"] = row["created_at"].month
+        return Response(
+            {
+                "since": since,
+                "next": next_seq,
+                "has_more": has_more,
+                "transactions": TransactionListSerializer(rows, many=True).data,
+                "deleted": deleted,
+            }
+        )
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        Stream every transaction matching the usual filter, search and
+        ordering parameters as CSV (default) or NDJSON (``?output=ndjson``).
+        """
+        output = request.query_params.get("output", "csv")
+        if output not in export.FORMATS:
+            choices = ", ".join(export.FORMATS)
+            return Response(
+                {"detail": f"Unsupported output, choose one of: {choices}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        generate, content_type, extension = export.FORMATS[output]
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(generate(queryset), content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="transactions.{extension}"'
+        )
+        return response
+
     serializer_class = TransactionSerializer
+
+
+class AnalyticsViewSet(viewsets.ViewSet):
+    """
+    Monthly and per-category totals for one year, read from MonthlyRollup
+    so at most 12 x categories rows are touched.
+
+    ``?year=`` defaults to the current year, ``?group_by=`` is ``month``
+    (default) or ``category``, and ``?month=`` narrows the category view.
+    """
+
+    def list(self, request):
+        params = request.query_params
+        group_by = params.get("group_by", "month")
+        try:
+            year = int(params.get("year", timezone.localdate().year))
+            month = int(params["month"]) if "month" in params else None
+        except ValueError:
+            return Response(
+                {"detail": "year and month must be numbers."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if group_by not in ("month", "category"):
+            return Response(
+                {"detail": "group_by must be 'month' or 'category'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = MonthlyRollup.objects.filter(
+            user_id=request.user.id, year=year, count__gt=0
+        )
+        if month is not None:
+            queryset = queryset.filter(month=month)
+
+        if group_by == "category":
+            rows = (
+                queryset.values("category_id")
+                .annotate(total=Sum("total"), count=Sum("count"))
+                .order_by("category_id")
+            )
+            results = [
+                {
+                    "category": category_cache.get_name(row["category_id"]),
+                    "total": row["total"],
+                    "count": row["count"],
+                }
+                for row in rows
+            ]
+        else:
+            months = {}
+            for row in queryset.values("month", "category_id", "total", "count"):
+                entry = months.setdefault(
+                    row["month"], {"month": row["month"], "count": 0, "categories": {}}
+                )
+                entry["count"] += row["count"]
+                name = category_cache.get_name(row["category_id"])
+                entry["categories"][name] = row["total"]
+            results = [months[key] for key in sorted(months)]
+
+        return Response({"year": year, "group_by": group_by, "results": results})
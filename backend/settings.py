@@ -50,6 +50,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "app.metrics.MetricsMiddleware",
+    "app.instrumentation.RequestTimingMiddleware",
+    "app.replicas.ReplicaRoutingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -97,9 +100,47 @@ DATABASES = {
         'PASSWORD': os.getenv('PASSWORD'),
         'HOST': os.getenv("HOST"),
         'PORT': os.getenv("PORT"),
+        # Seconds a connection is kept for the next request (and for the
+        # next query of the async views' pool threads) instead of being
+        # reopened every time.
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 60)),
     }
 }
 
+# A cache shared by every worker process, e.g. CACHE_BACKEND=
+# django.core.cache.backends.memcached.PyMemcacheCache with
+# CACHE_LOCATION=host:11211. Replica reads and the token generation cache
+# need one and stay off with the per-process default; see app/checks.py.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Read replicas (comma-separated hosts, same credentials as default). Safe
+# requests read from them unless the user wrote in the last
+# READ_YOUR_WRITES_SECONDS or a replica lags more than
+# REPLICA_MAX_LAG_SECONDS (checked every REPLICA_LAG_CHECK_INTERVAL
+# seconds); see app/replicas.py.
+DATABASE_REPLICAS = []
+REPLICA_HOSTS = [
+    host.strip() for host in os.getenv("REPLICA_HOSTS", "").split(",") if host.strip()
+]
+for index, host in enumerate(REPLICA_HOSTS, 1):
+    DATABASES[f"replica{index}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{index}")
+DATABASE_ROUTERS = ["app.replicas.ReplicaRouter"]
+READ_YOUR_WRITES_SECONDS = 5
+REPLICA_MAX_LAG_SECONDS = 5
+REPLICA_LAG_CHECK_INTERVAL = 5
+
 
 
 AUTH_USER_MODEL = "app.User"
@@ -120,11 +161,31 @@ AUTH_PASSWORD_VALIDATORS = [
     # },
 ]
 
+try:
+    import msgpack  # noqa: F401
+except ImportError:
+    MSGPACK_RENDERERS, MSGPACK_PARSERS = [], []
+else:
+    MSGPACK_RENDERERS = ['app.renderers.MessagePackRenderer']
+    MSGPACK_PARSERS = ['app.renderers.MessagePackParser']
+
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'app.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        *MSGPACK_RENDERERS,
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'app.renderers.FastJSONParser',
+        *MSGPACK_PARSERS,
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        'app.authentication.SignedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
@@ -132,6 +193,90 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10
 }
 
+# Lifetime of the bearer tokens issued by /v1/login/, and how long the
+# per-user revocation counter they are checked against may be cached.
+TOKEN_MAX_AGE = 60 * 60 * 24 * 7
+TOKEN_GENERATION_CACHE_TIMEOUT = 60
+
+# Seconds a worker trusts its in-memory category name/id map before reloading.
+CATEGORY_CACHE_TTL = 300
+
+# Limits for POST /v1/transaction/bulk/.
+TRANSACTION_BULK_MAX_ROWS = 5000
+TRANSACTION_BULK_BATCH_SIZE = 500
+
+# Seconds to cache list/detail responses per (user, data version, query);
+# 0 disables it. ETag/304 handling works either way.
+RESPONSE_CACHE_TIMEOUT = 0
+
+# Number of most recently active users whose title suggestions are held in
+# memory per worker (0 disables it), and how long those copies are trusted.
+# Writes only invalidate the copy in the worker that served them, so with
+# several workers a suggestion can be up to SUGGESTION_CACHE_TTL stale.
+SUGGESTION_CACHE_USERS = 0
+SUGGESTION_CACHE_TTL = 60
+
+# Seconds to cache a user's per-category counts and totals (summed from
+# MonthlyRollup) under their data version; 0 disables it.
+CATEGORY_TOTALS_CACHE_TIMEOUT = 60
+
+# Range-partition app_transaction by month on PostgreSQL (applied by
+# migration 0018 or `manage.py transaction_partitions enable`), and how
+# many months of partitions to keep created ahead; see app/partitions.py.
+TRANSACTION_PARTITIONING = os.getenv("TRANSACTION_PARTITIONING", "") == "1"
+TRANSACTION_PARTITIONS_AHEAD = 3
+
+# Above this many rows (by the PostgreSQL planner's estimate) admin
+# changelists show the estimate instead of running COUNT(*).
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
+# Rows fetched per round trip by GET /v1/transaction/export/.
+TRANSACTION_EXPORT_CHUNK_SIZE = 2000
+
+# Most changes returned by one GET /v1/transaction/changes/ batch.
+CHANGE_FEED_BATCH_SIZE = 500
+
+# Push events (app/events.py, served by app/push.py under ASGI): the
+# broker (app.events.PostgresBroker reaches every worker process), how
+# many undelivered events a connection may queue before it is told to
+# catch up through the change feed, and the SSE keep-alive interval.
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "app.events.LocalBroker")
+EVENTS_QUEUE_SIZE = 100
+EVENTS_HEARTBEAT_SECONDS = 25
+
+# Fraction of requests whose SQL and view/serializer timings are logged
+# (0 disables it), whether they are also returned in a Server-Timing
+# header, how many of the slowest statements to log, and how many runs of
+# one statement shape in a request are reported as an N+1.
+REQUEST_TIMING_SAMPLE_RATE = float(os.getenv("REQUEST_TIMING_SAMPLE_RATE", 0.01))
+REQUEST_TIMING_HEADER = DEBUG
+REQUEST_TIMING_SLOW_QUERIES = 3
+REQUEST_TIMING_REPEATED_QUERIES = 5
+
+# Directory shared by all worker processes for /metrics snapshots (unset
+# for a single process), how often each process rewrites its snapshot,
+# and the bearer token required to scrape /metrics. Without a token only
+# loopback and private addresses may scrape it; set one when a proxy on
+# such an address forwards outside requests.
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = 1
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'app.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 
 LANGUAGE_CODE = 'en-us'
 
@@ -0,0 +1,126 @@
+"""
+Compare the WSGI entry point (backend/wsgi.py) with the ASGI one
+(backend/asgi.py) for the transaction list at high concurrency.
+
+The real application callables are driven in-process, so no server is
+needed: WSGI requests run on a thread pool, ASGI requests are coroutines
+on one event loop. A throwaway test database is created and seeded first.
+
+    python benchmarks/asgi_vs_wsgi.py --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from common import seed_user, summarize, test_database
+
+
+def login(user):
+    from django.test import Client
+
+    client = Client()
+    client.force_login(user)
+    return client.cookies["sessionid"].value
+
+
+def run_wsgi(path, session, total, concurrency):
+    from backend.wsgi import application
+
+    def call():
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": path,
+            "QUERY_STRING": "",
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "HTTP_HOST": "localhost",
+            "HTTP_COOKIE": f"sessionid={session}",
+            "wsgi.input": BytesIO(),
+            "wsgi.url_scheme": "http",
+        }
+        start = time.perf_counter()
+        statuses = []
+        body = b"".join(application(environ, lambda s, h: statuses.append(s)))
+        assert statuses[0].startswith("200"), (statuses, body[:200])
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda _: call(), range(total)))
+    return latencies, time.perf_counter() - start
+
+
+def run_asgi(path, session, total, concurrency):
+    from backend.asgi import application
+
+    async def call(semaphore):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "headers": [
+                (b"host", b"localhost"),
+                (b"cookie", f"sessionid={session}".encode()),
+            ],
+            "server": ("localhost", 80),
+        }
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        async with semaphore:
+            start = time.perf_counter()
+            await application(scope, receive, send)
+            elapsed = time.perf_counter() - start
+        assert messages[0]["status"] == 200, messages
+        return elapsed
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(call(semaphore) for _ in range(total)))
+
+    start = time.perf_counter()
+    latencies = asyncio.run(main())
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--transactions", type=int, default=5000)
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    with test_database():
+        session = login(seed_user(args.transactions))
+        runs = [
+            ("wsgi /v1/transaction/", run_wsgi, "/v1/transaction/"),
+            ("asgi /v1/transaction/", run_asgi, "/v1/transaction/"),
+            ("asgi /v1/async/transaction/", run_asgi, "/v1/async/transaction/"),
+        ]
+        results = []
+        for name, runner, path in runs:
+            latencies, elapsed = runner(path, session, args.requests, args.concurrency)
+            results.append(summarize(name, latencies, elapsed))
+            print(json.dumps(results[-1]))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Shared setup for the scripts in this directory."""
+import os
+import random
+import statistics
+import sys
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+TITLES = (
+    "Salary Rent Groceries Coffee Lunch Dinner Taxi Bus Train Fuel Electricity"
+    " Water Internet Phone Gym Cinema Books Clothes Pharmacy Doctor Insurance"
+    " Gift Freelance Bonus Refund Dividends Parking Snacks Streaming Haircut"
+).split()
+
+
+@contextmanager
+def test_database():
+    """Set Django up against a throwaway test database, dropped on exit."""
+    import django
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    django.setup()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, keepdb=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed_user(transactions, email="bench@example.com"):
+    """Create a user with ``transactions`` income/expense rows."""
+    from django.contrib.auth import get_user_model
+
+    from app import bulk
+    from app.models import Category, Transaction
+
+    user = get_user_model().objects.create_user(
+        username="bench", email=email, password="bench"
+    )
+    income, _ = Category.objects.get_or_create(name="income")
+    expense, _ = Category.objects.get_or_create(name="expense")
+    bulk.create_transactions(
+        user,
+        [
+            Transaction(
+                user=user,
+                category=income if i % 5 == 0 else expense,
+                title=f"transaction {i}",
+                amount=(i % 500) + 1,
+            )
+            for i in range(transactions)
+        ],
+    )
+    return user
+
+
+@contextmanager
+def explicit_created_at():
+    """Let seeded rows keep the created_at they are given."""
+    from app.models import Transaction
+
+    field = Transaction._meta.get_field("created_at")
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def seed(users, transactions, months=12, batch_size=5000, password="bench"):
+    """
+    Insert ``users`` users and ``transactions`` transactions spread over the
+    last ``months`` months, then rebuild the ledger, rollups and suggestions
+    once instead of row by row. Activity is skewed so a few users own most
+    rows, as in production. Returns the users; the first one is staff.
+    """
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from django.utils import timezone
+
+    from app import ledger, rollups, suggestions
+    from app.models import Category, Transaction
+
+    User = get_user_model()
+    rng = random.Random(0)
+    hashed = make_password(password)
+    User.objects.bulk_create(
+        (
+            User(
+                username=f"user{i}",
+                email=f"user{i}@bench.test",
+                password=hashed,
+                is_staff=i == 0,
+            )
+            for i in range(users)
+        ),
+        batch_size=1000,
+    )
+    seeded = list(User.objects.filter(email__endswith="@bench.test").order_by("id"))
+    income, _ = Category.objects.get_or_create(name="income")
+    expense, _ = Category.objects.get_or_create(name="expense")
+
+    weights = [1 / (rank + 1) for rank in range(len(seeded))]
+    now = timezone.now()
+    span = timedelta(days=30 * months).total_seconds()
+    with explicit_created_at():
+        for start in range(0, transactions, batch_size):
+            count = min(batch_size, transactions - start)
+            owners = rng.choices(seeded, weights=weights, k=count)
+            Transaction.objects.bulk_create(
+                Transaction(
+                    user_id=owner.id,
+                    category=income if rng.random() < 0.2 else expense,
+                    title=rng.choice(TITLES),
+                    amount=round(rng.uniform(1, 2000), 2),
+                    created_at=now - timedelta(seconds=rng.uniform(0, span)),
+                )
+                for owner in owners
+            )
+
+    ledger.rebuild()
+    rollups.rebuild()
+    suggestions.rebuild()
+    return seeded
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(name, latencies, elapsed):
+    return {
+        "name": name,
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
@@ -0,0 +1,259 @@
+"""
+Seeded benchmark suite for the main API scenarios.
+
+A throwaway test database is seeded with ``--users`` users and
+``--transactions`` transactions spread over a year. Each scenario is
+then run in two ways:
+
+* ``client``: sequential requests through the Django test client, with
+  the number of SQL queries of every request recorded;
+* ``http``: ``--concurrency`` threads sending real HTTP requests to a
+  threaded WSGI server started on a free local port.
+
+Results (p50/p95/p99 latency, throughput, queries per request) are
+printed and can be saved as a baseline and compared with a later run:
+
+    python benchmarks/run.py --output baseline.json
+    python benchmarks/run.py --compare baseline.json
+
+Use ``DJANGO_SETTINGS_MODULE=sqlite_settings`` to run without PostgreSQL.
+"""
+import argparse
+import json
+import random
+import statistics
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from common import TITLES, seed, summarize, test_database
+
+PASSWORD = "bench"
+# SQLite's shared in-memory database cannot take concurrent writes.
+WRITES = {"login", "transaction create"}
+
+
+def scenarios(users, staff, rng):
+    """Map each scenario name to a factory of (method, path, body, user)."""
+
+    def any_user():
+        return rng.choice(users)
+
+    return {
+        "transaction list": lambda: ("GET", "/v1/transaction/", None, any_user()),
+        "transaction list cursor": lambda: (
+            "GET",
+            "/v1/transaction/?pagination=cursor",
+            None,
+            any_user(),
+        ),
+        "transaction list page 5": lambda: (
+            "GET",
+            "/v1/transaction/?page=5",
+            None,
+            users[0],
+        ),
+        "transaction search": lambda: (
+            "GET",
+            f"/v1/transaction/?search={rng.choice(TITLES)[:4]}",
+            None,
+            any_user(),
+        ),
+        "category list": lambda: ("GET", "/v1/category/", None, staff),
+        "login": lambda: (
+            "POST",
+            "/v1/login/",
+            {"email": any_user().email, "password": PASSWORD},
+            None,
+        ),
+        "transaction create": lambda: (
+            "POST",
+            "/v1/transaction/",
+            {
+                "category": rng.choice(["income", "expense"]),
+                "title": rng.choice(TITLES),
+                "amount": round(rng.uniform(1, 2000), 2),
+            },
+            any_user(),
+        ),
+    }
+
+
+def run_client(name, make_request, tokens, total):
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client()
+    latencies, queries = [], []
+    start = time.perf_counter()
+    for _ in range(total):
+        method, path, body, user = make_request()
+        headers = {}
+        if user is not None:
+            headers["HTTP_AUTHORIZATION"] = f"Bearer {tokens[user.pk]}"
+        with CaptureQueriesContext(connection) as captured:
+            began = time.perf_counter()
+            if method == "GET":
+                response = client.get(path, **headers)
+            else:
+                response = client.post(
+                    path, body, content_type="application/json", **headers
+                )
+            latencies.append(time.perf_counter() - began)
+        assert response.status_code < 300, (name, response.status_code)
+        queries.append(len(captured))
+    result = summarize(name, latencies, time.perf_counter() - start)
+    result["queries_mean"] = round(statistics.mean(queries), 1)
+    result["queries_max"] = max(queries)
+    return result
+
+
+def start_server():
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+
+    from backend.wsgi import application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = ThreadedWSGIServer(
+        ("127.0.0.1", 0), QuietHandler, allow_reuse_address=True
+    )
+    server.set_app(application)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_http(name, make_request, tokens, total, concurrency, base_url):
+    def call(_):
+        method, path, body, user = make_request()
+        request = urllib.request.Request(
+            base_url + path,
+            data=json.dumps(body).encode() if body is not None else None,
+            method=method,
+            headers={"Content-Type": "application/json"},
+        )
+        if user is not None:
+            request.add_header("Authorization", f"Bearer {tokens[user.pk]}")
+        began = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+        except urllib.error.HTTPError as exc:
+            raise AssertionError((name, exc.code, exc.read()[:200]))
+        return time.perf_counter() - began
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(call, range(total)))
+    return summarize(name, latencies, time.perf_counter() - start)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, report):
+    """Print each metric next to the baseline with the relative change."""
+    for mode, results in report["results"].items():
+        for name, result in results.items():
+            before = baseline["results"].get(mode, {}).get(name)
+            if before is None:
+                continue
+            print(f"{mode} {name}")
+            for metric, value in result.items():
+                old = before.get(metric)
+                if metric == "name" or not old:
+                    continue
+                change = (value - old) / old * 100
+                print(f"  {metric:15} {old:>10} -> {value:>10} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--transactions", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scenario", action="append", help="Only run these.")
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--compare", help="Baseline JSON file to compare with.")
+    args = parser.parse_args()
+
+    with test_database():
+        from django.db import connection
+
+        from app.authentication import issue_token
+
+        began = time.perf_counter()
+        users = seed(args.users, args.transactions, password=PASSWORD)
+        seed_seconds = round(time.perf_counter() - began, 1)
+        tokens = {user.pk: issue_token(user) for user in users}
+
+        rng = random.Random(1)
+        available = scenarios(users, users[0], rng)
+        names = args.scenario or list(available)
+
+        report = {
+            "meta": {
+                "vendor": connection.vendor,
+                "users": args.users,
+                "transactions": args.transactions,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "commit": git_commit(),
+                "seed_seconds": seed_seconds,
+            },
+            "results": {"client": {}, "http": {}},
+        }
+        for name in names:
+            result = run_client(name, available[name], tokens, args.requests)
+            report["results"]["client"][name] = result
+            print(json.dumps({"mode": "client", **result}))
+
+        if not args.skip_http:
+            server = start_server()
+            base_url = "http://127.0.0.1:%d" % server.server_address[1]
+            try:
+                for name in names:
+                    concurrency = args.concurrency
+                    if connection.vendor == "sqlite" and name in WRITES:
+                        concurrency = 1
+                    result = run_http(
+                        name,
+                        available[name],
+                        tokens,
+                        args.requests,
+                        concurrency,
+                        base_url,
+                    )
+                    result["concurrency"] = concurrency
+                    report["results"]["http"][name] = result
+                    print(json.dumps({"mode": "http", **result}))
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Rows per second for serializing a transaction list page, comparing the
+full TransactionSerializer on model instances with TransactionListSerializer
+on ``.values()`` rows as used by the list endpoint.
+
+    python benchmarks/serialization.py --rows 10000 --repeat 5
+"""
+import argparse
+import json
+import time
+
+from common import seed_user, test_database
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with test_database():
+        from django.db.models.functions import ExtractMonth
+        from django.utils.timezone import utc
+
+        from app.models import Transaction
+        from app.serializers import TransactionListSerializer, TransactionSerializer
+
+        user = seed_user(args.rows)
+        full = Transaction.objects.select_related("user", "category").filter(
+            user_id=user.id
+        )
+        fast = (
+            Transaction.objects.filter(user_id=user.id)
+            .values(*TransactionListSerializer.fields)
+            .annotate(month=ExtractMonth("created_at", tzinfo=utc))
+        )
+
+        cases = [
+            (
+                "TransactionSerializer",
+                lambda: TransactionSerializer(list(full), many=True).data,
+            ),
+            (
+                "TransactionListSerializer",
+                lambda: TransactionListSerializer(list(fast), many=True).data,
+            ),
+        ]
+        for name, func in cases:
+            elapsed = best_of(args.repeat, func)
+            print(
+                json.dumps(
+                    {
+                        "name": name,
+                        "rows": args.rows,
+                        "seconds": round(elapsed, 4),
+                        "rows_per_second": round(args.rows / elapsed),
+                    }
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
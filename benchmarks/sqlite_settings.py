@@ -0,0 +1,11 @@
+"""
+Run the benchmarks on SQLite without a PostgreSQL server:
+
+    DJANGO_SETTINGS_MODULE=sqlite_settings python benchmarks/run.py
+"""
+import os
+
+from backend.settings import *  # noqa: F401,F403
+
+SECRET_KEY = os.getenv("SECRET_KEY") or "benchmark"
+DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}}